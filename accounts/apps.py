@@ -1,3 +1,6 @@
 from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
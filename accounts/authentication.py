@@ -0,0 +1,37 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .user_cache import USER_CLAIMS, get_cached_user, get_user_state, user_from_claims
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the token's claims.
+
+    No query is made per request: role changes and deactivation made after
+    the token was issued come from the cached user state, or from the
+    table when the cache is not shared. Tokens issued without the claims
+    fall back to the cached user row.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+            state = get_user_state(user_id)
+            if state is not None:
+                claims.update(state)
+            user = user_from_claims(user_id, claims)
+        else:
+            user = get_cached_user(user_id)
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
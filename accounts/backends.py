@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.utils.crypto import get_random_string
+from .hashing import verify_password
+
+UserModel = get_user_model()
+
+
+class PooledHashingBackend(ModelBackend):
+    """
+    ``ModelBackend`` with password checks run by ``accounts.hashing``.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so unknown usernames take as long as wrong passwords.
+            verify_password(password, get_dummy_hash())
+            return None
+
+        valid, upgraded = verify_password(password, user.password)
+        if not valid:
+            return None
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return user if self.user_can_authenticate(user) else None
+
+
+_dummy_hash = None
+
+
+def get_dummy_hash():
+    # A real hash with the preferred hasher, so checking it costs the same.
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = make_password(get_random_string(32))
+    return _dummy_hash
@@ -0,0 +1,216 @@
+"""
+Refresh token blacklist lookups without a query per refresh.
+
+The ``token_blacklist`` tables stay the source of truth; checking them on
+every refresh is what this module avoids. Each process keeps a Bloom
+filter of the jtis of blacklisted, unexpired tokens:
+
+* a jti the filter does not contain is not blacklisted, and no query is
+  made -- the common case, whatever the size of the tables;
+* a jti it may contain is confirmed against the database, so a false
+  positive costs one indexed query and never a wrongly refused token.
+
+The filter is loaded on first use and then picks up new rows by primary
+key every ``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds. Each sync re-reads
+the rows of the last ``SYNC_OVERLAP`` seconds, so a row whose transaction
+committed after a higher id was seen is not missed. Tokens blacklisted
+since the last sync are also written to the cache under
+``accounts:blacklisted:<jti>`` until they expire; with a shared cache
+(Redis) that closes the gap for the other processes as well.
+
+Expired tokens fail validation before the blacklist matters, so
+``purge_expired_tokens`` can delete them; the filter is rebuilt without
+them once it fills up.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+SYNC_OVERLAP = 60
+
+
+def get_sync_interval():
+    return getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5)
+
+
+def get_filter_capacity():
+    return getattr(settings, 'TOKEN_BLACKLIST_FILTER_CAPACITY', 100000)
+
+
+def get_filter_error_rate():
+    return getattr(settings, 'TOKEN_BLACKLIST_FILTER_ERROR_RATE', 0.001)
+
+
+def _cache_key(jti):
+    return f'accounts:blacklisted:{jti}'
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter of strings, sized for ``capacity`` entries
+    at ``error_rate`` false positives.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from one 128-bit digest.
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def is_full(self):
+        return self.count > self.capacity
+
+
+class BlacklistIndex:
+    """
+    The per-process filter of blacklisted jtis and its sync state.
+    """
+
+    def __init__(self):
+        self.filter = None
+        self.last_id = 0
+        self.synced_at = None
+        self.marks = deque()
+        self.stats = {'filtered': 0, 'queried': 0}
+        self._lock = threading.Lock()
+
+    def rebuild(self, capacity=None):
+        """
+        Load the jtis of every unexpired blacklisted token.
+        """
+        rows = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .order_by('id').values_list('id', 'token__jti')
+        )
+        count = rows.count()
+        bloom = BloomFilter(max(capacity or get_filter_capacity(), 2 * count), get_filter_error_rate())
+        last_id = 0
+        for row_id, jti in rows.iterator(chunk_size=10000):
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        self.filter = bloom
+        self.last_id = last_id
+        self.synced_at = time.monotonic()
+        self.marks = deque([(self.synced_at, last_id)])
+
+    def sync(self):
+        """
+        Add the rows blacklisted since the last sync, at most once per interval.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.filter is None:
+                self.rebuild()
+                return
+            if now - self.synced_at < get_sync_interval():
+                return
+            # Start from the newest id seen at least SYNC_OVERLAP seconds ago.
+            while len(self.marks) > 1 and now - self.marks[1][0] >= SYNC_OVERLAP:
+                self.marks.popleft()
+            floor = self.marks[0][1]
+            rows = BlacklistedToken.objects.filter(id__gt=floor).order_by('id').values_list('id', 'token__jti')
+            for row_id, jti in rows.iterator(chunk_size=10000):
+                if row_id > self.last_id:
+                    self.filter.add(jti)
+                    self.last_id = row_id
+                elif jti not in self.filter:
+                    # Committed late, behind an id seen before.
+                    self.filter.add(jti)
+            if self.filter.is_full():
+                self.rebuild(self.filter.capacity * 2)
+                return
+            self.synced_at = now
+            self.marks.append((now, self.last_id))
+
+    def add(self, jti):
+        with self._lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.filter
+
+
+_index = None
+_index_pid = None
+_lock = threading.Lock()
+
+
+def get_blacklist_index():
+    global _index, _index_pid
+    with _lock:
+        # Built lazily and per process, like the IP index.
+        if _index is None or _index_pid != os.getpid():
+            _index = BlacklistIndex()
+            _index_pid = os.getpid()
+        return _index
+
+
+def is_blacklisted(jti):
+    index = get_blacklist_index()
+    if not index.might_contain(jti):
+        index.stats['filtered'] += 1
+        # Blacklisted elsewhere since this process last synced.
+        return bool(cache.get(_cache_key(jti)))
+    index.stats['queried'] += 1
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def record_blacklisted(jti, exp):
+    """
+    Make a token just written to the blacklist visible before the next sync.
+    """
+    get_blacklist_index().add(jti)
+    timeout = exp - int(time.time())
+    if timeout > 0:
+        cache.set(_cache_key(jti), True, timeout=timeout)
+
+
+def purge_expired_tokens(cutoff=None, batch_size=5000):
+    """
+    Delete outstanding tokens that expired before ``cutoff``, with their
+    blacklist rows, in bounded batches.
+
+    Batches are read in primary key order and each one is deleted in its
+    own short transaction. Returns the number of outstanding tokens deleted.
+    """
+    cutoff = cutoff or timezone.now()
+    expired = OutstandingToken.objects.filter(expires_at__lte=cutoff).order_by('id')
+    last_id = 0
+    purged = 0
+    while True:
+        ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        last_id = ids[-1]
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
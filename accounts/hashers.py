@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the iteration count taken from ``PASSWORD_PBKDF2_ITERATIONS``.
+
+    It keeps Django's ``pbkdf2_sha256`` algorithm name, so existing hashes
+    verify unchanged and are rehashed at the configured cost on the next
+    successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,165 @@
+"""
+Password verification off the request thread.
+
+Hashing is CPU bound by design, so a burst of logins run on the request
+threads takes every core the web workers have and starves all other
+requests. ``verify_password`` hands each hash to a per-process
+``ProcessPoolExecutor`` of ``LOGIN_HASH_WORKERS`` processes instead: at
+most that many hashes per web worker run at once, the rest queue, and
+the waiting request thread holds no CPU while the worker's other threads
+keep serving. ``LOGIN_HASH_WORKERS = 0`` hashes inline.
+
+Successful verifications are remembered for ``LOGIN_VERIFY_CACHE_TTL``
+seconds as an HMAC under a random per-process key, so a client logging in
+again with the same password skips the hash. Entries are keyed on the
+stored hash, so changing the password drops them; failed attempts are
+never cached and always pay the full cost.
+
+The pool uses the ``spawn`` start method, so its workers do not inherit
+the web process's threads and connections. This module must stay
+importable without the app registry, as the workers import it to run
+``_verify``.
+"""
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+def get_hash_workers():
+    return getattr(settings, 'LOGIN_HASH_WORKERS', 2)
+
+
+def get_verify_cache_ttl():
+    return getattr(settings, 'LOGIN_VERIFY_CACHE_TTL', 300)
+
+
+def get_verify_cache_size():
+    return getattr(settings, 'LOGIN_VERIFY_CACHE_SIZE', 10000)
+
+
+def _verify(password, encoded):
+    """
+    Check ``password`` against ``encoded`` and return ``(valid, upgraded)``,
+    where ``upgraded`` is a new hash when the preferred hasher or its cost
+    has changed.
+    """
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+class VerifiedPasswordCache:
+    """
+    A bounded LRU of recently verified ``(stored hash, password)`` pairs.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.key = os.urandom(32)
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _digest(self, password, encoded):
+        message = encoded.encode('utf-8') + b'\0' + password.encode('utf-8')
+        return hmac.new(self.key, message, hashlib.sha256).digest()
+
+    def check(self, password, encoded):
+        digest = self._digest(password, encoded)
+        now = time.monotonic()
+        with self._lock:
+            expires = self.entries.get(digest)
+            if expires is not None and expires > now:
+                self.entries.move_to_end(digest)
+                self.stats['hits'] += 1
+                return True
+            if expires is not None:
+                del self.entries[digest]
+            self.stats['misses'] += 1
+            return False
+
+    def add(self, password, encoded, ttl):
+        digest = self._digest(password, encoded)
+        with self._lock:
+            self.entries[digest] = time.monotonic() + ttl
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+_pool = None
+_pool_pid = None
+_verified = None
+_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """
+    Return this process's hashing pool, or None to hash inline.
+    """
+    global _pool, _pool_pid
+    workers = get_hash_workers()
+    if workers <= 0:
+        return None
+    with _lock:
+        # Started lazily and per process, like the audit writer.
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def get_verified_cache():
+    global _verified
+    with _lock:
+        if _verified is None:
+            _verified = VerifiedPasswordCache(get_verify_cache_size())
+        return _verified
+
+
+def shutdown_hash_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _reset_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def verify_password(password, encoded):
+    """
+    Verify a password against a stored hash; see ``_verify`` for the result.
+    """
+    ttl = get_verify_cache_ttl()
+    if ttl > 0 and encoded and get_verified_cache().check(password, encoded):
+        return True, None
+
+    pool = get_hash_pool()
+    if pool is None:
+        valid, upgraded = _verify(password, encoded)
+    else:
+        try:
+            valid, upgraded = pool.submit(_verify, password, encoded).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time.
+            _reset_pool(pool)
+            valid, upgraded = _verify(password, encoded)
+
+    if valid and ttl > 0:
+        get_verified_cache().add(password, upgraded or encoded, ttl)
+    return valid, upgraded
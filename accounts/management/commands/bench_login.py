@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from accounts import hashing
+from accounts.models import User
+from accounts.views import login_view
+
+PASSWORD = 'bench-login-password'
+
+class Command(BaseCommand):
+    help = 'Benchmark login throughput (logins/sec per core) with inline and pooled hashing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50,
+                            help='Distinct accounts logging in')
+        parser.add_argument('--logins', type=int, default=200,
+                            help='Logins per scenario')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Concurrent request threads, like a threaded gunicorn worker')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Hashing pool size for the pooled scenarios')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 iterations (defaults to PASSWORD_PBKDF2_ITERATIONS)')
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['iterations']:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = options['iterations']
+            # Pool workers are separate processes that read the settings module.
+            os.environ['PASSWORD_PBKDF2_ITERATIONS'] = str(options['iterations'])
+        with override_settings(**overrides):
+            # One hash for every account: creating them is not what is measured.
+            encoded = make_password(PASSWORD)
+            users = User.objects.bulk_create(
+                User(username=f'bench-login-{i}', password=encoded) for i in range(options['users'])
+            )
+            try:
+                scenarios = [
+                    ('inline', 0, 0),
+                    ('pooled', options['workers'], 0),
+                    ('pooled + cache', options['workers'], 300),
+                ]
+                for label, workers, ttl in scenarios:
+                    cores = min(max(workers, 1), os.cpu_count())
+                    with override_settings(LOGIN_HASH_WORKERS=workers, LOGIN_VERIFY_CACHE_TTL=ttl):
+                        hashing.shutdown_hash_pool()
+                        hashing.get_verified_cache().entries.clear()
+                        # Warm up: the pool is started and, with the cache,
+                        # every client has logged in once already.
+                        self.run(users, len(users), options['concurrency'])
+                        self.report(label, cores, *self.run(users, options['logins'], options['concurrency']))
+            finally:
+                hashing.shutdown_hash_pool()
+                User.objects.filter(username__startswith='bench-login-').delete()
+
+    def run(self, users, count, concurrency):
+        factory = APIRequestFactory()
+
+        def login(i):
+            user = users[i % len(users)]
+            # One address per request, so the login throttle stays out of the way.
+            request = factory.post(
+                '/api/auth/login/', {'username': user.username, 'password': PASSWORD},
+                format='json', REMOTE_ADDR=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+            )
+            try:
+                return login_view(request).status_code
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(login, range(count)))
+        return count, time.perf_counter() - started, statuses.count(200)
+
+    def report(self, label, cores, count, elapsed, succeeded):
+        rate = count / elapsed
+        self.stdout.write(
+            f'{label:>15}: {succeeded}/{count} logins in {elapsed:.2f}s, '
+            f'{rate:.1f}/s, {rate / cores:.1f}/s per core ({cores} core{"s" if cores > 1 else ""})'
+        )
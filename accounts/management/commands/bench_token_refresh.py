@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+from uuid import uuid4
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+from accounts import blacklist
+from accounts.models import User
+from accounts.tokens import token_for_user
+
+class Command(BaseCommand):
+    help = 'Benchmark token refresh latency as the blacklist tables grow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated blacklist sizes')
+        parser.add_argument('--refreshes', type=int, default=200,
+                            help='Refreshes timed per size')
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username='bench-refresh')
+        view = TokenRefreshView.as_view()
+        factory = APIRequestFactory()
+        created = []
+        rotated = []
+        try:
+            for size in sorted(int(size) for size in options['sizes'].split(',')):
+                created += self.grow(user, size - len(created))
+                # A fresh process: the filter is loaded before timing.
+                blacklist._index = None
+                blacklist.get_blacklist_index().sync()
+
+                refresh = str(token_for_user(user))
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['refreshes']):
+                        started = time.perf_counter()
+                        response = view(factory.post('/api/auth/refresh/', {'refresh': refresh}, format='json'))
+                        timings.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            raise RuntimeError(f'Refresh failed: {response.data}')
+                        rotated.append(RefreshToken(refresh, verify=False)['jti'])
+                        refresh = response.data['refresh']
+                # The membership check joins to the outstanding token by jti;
+                # blacklisting the rotated token is a write and is expected.
+                checks = sum('JOIN' in query['sql'] and 'token_blacklist_blacklistedtoken' in query['sql']
+                             for query in queries.captured_queries)
+                timings.sort()
+                self.stdout.write(
+                    f'{size:>9} blacklisted: median {timings[len(timings) // 2] * 1000:.2f}ms, '
+                    f'p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms, '
+                    f'{len(queries) / options["refreshes"]:.1f} queries and '
+                    f'{checks / options["refreshes"]:.2f} blacklist lookups per refresh'
+                )
+        finally:
+            # Rotated tokens are blacklisted without a user.
+            OutstandingToken.objects.filter(jti__in=rotated).delete()
+            OutstandingToken.objects.filter(user=user).delete()
+            user.delete()
+
+    def grow(self, user, count):
+        expires_at = timezone.now() + timedelta(days=1)
+        created = []
+        for start in range(0, count, 10000):
+            tokens = OutstandingToken.objects.bulk_create(
+                OutstandingToken(user=user, jti=uuid4().hex, token='', expires_at=expires_at)
+                for _ in range(min(10000, count - start))
+            )
+            if tokens[0].pk is None:
+                # Backends that do not return primary keys from bulk inserts.
+                tokens = list(OutstandingToken.objects.filter(jti__in=[token.jti for token in tokens]))
+            BlacklistedToken.objects.bulk_create(BlacklistedToken(token=token) for token in tokens)
+            created += tokens
+        return created
@@ -0,0 +1,19 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.blacklist import purge_expired_tokens
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Tokens deleted per batch')
+        parser.add_argument('--grace', type=int, default=0,
+                            help='Keep tokens for this many seconds past their expiry')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        self.stdout.write(f'Purging refresh tokens that expired before {cutoff.isoformat()}...')
+        purged = purge_expired_tokens(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired tokens'))
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+from .user_cache import record_user_change
+
+
+@receiver(post_save, sender=User)
+def record_user_change_on_save(sender, instance, update_fields=None, **kwargs):
+    # Logins only write last_login; nothing tokens depend on.
+    if update_fields is not None and not {'role', 'is_active'} & set(update_fields):
+        return
+    user_id, role, is_active = instance.pk, instance.role, instance.is_active
+    transaction.on_commit(lambda: record_user_change(user_id, role, is_active))
+
+
+@receiver(post_delete, sender=User)
+def record_user_change_on_delete(sender, instance, **kwargs):
+    user_id, role = instance.pk, instance.role
+    transaction.on_commit(lambda: record_user_change(user_id, role, False))
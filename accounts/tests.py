@@ -0,0 +1,63 @@
+import tempfile
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from .authentication import ClaimsJWTAuthentication
+from .models import User
+from .tokens import token_for_user
+from .user_cache import cache_is_shared
+
+
+class UserChangeTests(TestCase):
+    """
+    Demotion and deactivation reach requests made with a token issued before.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('netops', role='engineer')
+        self.access = token_for_user(self.user).access_token
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def authenticate(self):
+        return ClaimsJWTAuthentication().get_user(self.access)
+
+    def change(self, **fields):
+        # The signals record the change once the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(self.user, name, value)
+            self.user.save()
+
+    def test_local_cache_reads_the_table(self):
+        self.assertFalse(cache_is_shared())
+        self.change(role='viewer')
+        # What another worker sees: nothing recorded in its own cache.
+        cache.clear()
+        self.assertEqual(self.authenticate().role, 'viewer')
+
+        self.change(is_active=False)
+        cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_local_cache_refuses_deleted_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_shared_cache_applies_recorded_change(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=caches):
+                self.assertTrue(cache_is_shared())
+                self.assertEqual(self.authenticate().role, 'engineer')
+
+                self.change(role='viewer')
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.authenticate().role, 'viewer')
+
+                self.change(is_active=False)
+                with self.assertRaises(AuthenticationFailed):
+                    self.authenticate()
@@ -0,0 +1,67 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import is_blacklisted, record_blacklisted
+from .user_cache import USER_CLAIMS, get_cached_user
+
+
+class BlacklistRefreshToken(RefreshToken):
+    """
+    A refresh token whose blacklist check goes through ``accounts.blacklist``
+    instead of querying the blacklist table every time.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        record_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return blacklisted
+
+
+def set_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+def token_for_user(user):
+    """
+    A refresh token whose access tokens carry the user's role claims.
+    """
+    refresh = BlacklistRefreshToken.for_user(user)
+    set_user_claims(refresh, user)
+    return refresh
+
+
+class UserClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh with the user's current claims rather than the ones copied
+    from the refresh token, and refuse users that are gone or inactive.
+    """
+
+    token_class = BlacklistRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = get_cached_user(refresh[api_settings.USER_ID_CLAIM])
+        if user is None or not user.is_active:
+            raise InvalidToken(_('User not found or inactive'))
+        set_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
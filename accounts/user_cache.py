@@ -0,0 +1,93 @@
+"""
+Users resolved without a database query per request.
+
+Access tokens carry the claims permission checks need (``USER_CLAIMS``),
+and ``user_from_claims`` turns them into a ``User`` whose other fields are
+deferred. Two cache entries cover what the token cannot know:
+
+* ``accounts:user:<id>`` -- the full row, for the paths that still need
+  it (token refresh, tokens issued without claims), kept for
+  ``USER_CACHE_TTL`` seconds;
+* ``accounts:user_state:<id>`` -- the current ``role`` and ``is_active``
+  of a user changed after their tokens were issued. It outlives every
+  access token issued before the change, so those tokens pick up the new
+  role, or stop working, on their next request.
+
+Both are written by the ``User`` signals in ``accounts.signals``. Other
+processes see them only through a shared cache (Redis). With a
+process-local cache (the default ``LocMemCache``) a change made in one
+worker would be invisible to the others, so neither entry is trusted:
+the user's ``role`` and ``is_active`` are read from the table on every
+request instead, one primary-key query.
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+def get_user_cache_ttl():
+    return getattr(settings, 'USER_CACHE_TTL', 60)
+
+
+def cache_is_shared():
+    """
+    Whether the default cache is seen by every worker process.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def _user_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def _state_key(user_id):
+    return f'accounts:user_state:{user_id}'
+
+
+def get_cached_user(user_id):
+    """
+    Return the ``User`` row, from the cache when possible; None if it does not exist.
+    """
+    if not cache_is_shared():
+        # Another worker's change could not drop a local copy.
+        return User.objects.filter(pk=user_id).first()
+    user = cache.get(_user_key(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(_user_key(user_id), user, timeout=get_user_cache_ttl())
+    return user
+
+
+def get_user_state(user_id):
+    """
+    Return the ``role`` and ``is_active`` to apply over a token's claims,
+    or None if nothing changed since the token was issued.
+    """
+    if not cache_is_shared():
+        state = User.objects.filter(pk=user_id).values('role', 'is_active').first()
+        # A deleted user is refused like a deactivated one.
+        return state if state is not None else {'is_active': False}
+    return cache.get(_state_key(user_id))
+
+
+def record_user_change(user_id, role, is_active):
+    cache.delete(_user_key(user_id))
+    timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(_state_key(user_id), {'role': role, 'is_active': is_active}, timeout=timeout)
+
+
+def user_from_claims(user_id, claims):
+    """
+    Build a ``User`` from token claims. Its other fields are deferred, so
+    reading one loads it, and ``save()`` only writes the loaded fields.
+    """
+    values = {'id': user_id, 'is_active': True, **claims}
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
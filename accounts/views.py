@@ -1,10 +1,11 @@
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import User
 from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer
+from .throttles import LoginRateThrottle
+from .tokens import BlacklistRefreshToken, token_for_user
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -13,11 +14,12 @@ class RegisterView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_view(request):
     serializer = LoginSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = token_for_user(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -29,7 +31,7 @@ def login_view(request):
 def logout_view(request):
     try:
         refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = BlacklistRefreshToken(refresh_token)
         token.blacklist()
         return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -40,4 +42,5 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user is built from token claims; profiles need the whole row.
+        return User.objects.get(pk=self.request.user.pk)
@@ -0,0 +1,56 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from audit import partitions
+from audit.retention import (
+    ArchiveWriter, archive_batched, archive_partitions, get_archive_dir, get_retention_days,
+)
+
+class Command(BaseCommand):
+    help = 'Archive audit logs older than the retention period to compressed JSONL and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Retention period in days (default: AUDIT_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows archived and deleted per batch')
+        parser.add_argument('--output-dir', default=None,
+                            help='Archive directory (default: AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--no-archive', action='store_true',
+                            help='Delete expired rows without writing an archive')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Write the archive but keep the rows')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_retention_days()
+        now = timezone.now()
+        cutoff = now - timedelta(days=days)
+
+        writer = None
+        if not options['no_archive']:
+            output_dir = options['output_dir'] or get_archive_dir()
+            path = os.path.join(output_dir, f'audit-{cutoff:%Y%m%d}-{now:%Y%m%dT%H%M%S}.jsonl.gz')
+            writer = ArchiveWriter(path)
+
+        self.stdout.write(f'Archiving audit logs older than {cutoff.isoformat()}...')
+        try:
+            archived, since = 0, None
+            if partitions.is_partitioned():
+                archived, dropped, since = archive_partitions(cutoff, writer, options['batch_size'], options['dry_run'])
+                for name in dropped:
+                    self.stdout.write(f"{'Would drop' if options['dry_run'] else 'Dropped'} partition {name}")
+                if not options['dry_run']:
+                    partitions.ensure_partitions(now)
+            archived += archive_batched(cutoff, writer, options['batch_size'], options['dry_run'], since)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is not None:
+            self.stdout.write(f'Wrote {writer.rows} rows to {writer.path}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Found' if options['dry_run'] else 'Archived and deleted'} {archived} expired audit logs"
+            )
+        )
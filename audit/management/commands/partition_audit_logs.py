@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from audit import partitions
+
+class Command(BaseCommand):
+    help = 'Convert the audit log table to monthly partitions and create upcoming partitions (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Rebuild the existing table as a partitioned table (takes an exclusive lock)')
+        parser.add_argument('--months-ahead', type=int, default=2,
+                            help='Number of future monthly partitions to keep created')
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            raise CommandError('Audit log partitioning requires PostgreSQL')
+
+        now = timezone.now()
+        if not partitions.is_partitioned():
+            if not options['convert']:
+                raise CommandError('Audit log table is not partitioned yet; rerun with --convert')
+            self.stdout.write('Converting audit log table to monthly partitions...')
+            partitions.convert_to_partitioned(now, options['months_ahead'])
+
+        partitions.ensure_partitions(now, options['months_ahead'])
+        for name, start, end in partitions.list_partitions():
+            self.stdout.write(f'{name}: {start:%Y-%m-%d} .. {end:%Y-%m-%d}')
+        self.stdout.write(self.style.SUCCESS('Audit log partitions are up to date'))
@@ -2,6 +2,7 @@ import json
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.contenttypes.models import ContentType
 from .models import AuditLog
+from .writer import get_audit_writer
 
 class AuditMiddleware(MiddlewareMixin):
     """
@@ -66,7 +67,8 @@ class AuditMiddleware(MiddlewareMixin):
                                 'status_code': response.status_code
                             }
 
-                    AuditLog.objects.create(
+                    # Queued for the background writer; no INSERT on the request path.
+                    get_audit_writer().enqueue(AuditLog(
                         user=request.user,
                         action=action,
                         object_repr=object_repr,
@@ -74,7 +76,7 @@ class AuditMiddleware(MiddlewareMixin):
                         ip_address=request._audit_data['ip_address'],
                         user_agent=request._audit_data['user_agent'],
                         additional_data=additional_data
-                    )
+                    ))
                 except Exception:
                     # Don't let audit logging break the application
                     pass
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -24,11 +25,16 @@ class AuditLog(models.Model):
     changes = models.JSONField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is built, not when the batched writer inserts it.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     additional_data = models.JSONField(null=True, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='audit_ts_id_idx'),
+            models.Index(fields=['user', '-timestamp', '-id'], name='audit_user_ts_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.timestamp}"
@@ -0,0 +1,108 @@
+import base64
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TimestampCursorPagination(BasePagination):
+    """
+    Keyset pagination over ``(timestamp, id)``, newest first.
+
+    Each page is a single indexed range scan: the cursor carries the
+    ``(timestamp, id)`` of the last row seen and the next page filters
+    strictly past it. There is no OFFSET and no ``COUNT(*)``, so page
+    latency does not depend on how deep the client has paged.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def encode_cursor(self, reverse, timestamp, pk):
+        raw = f"{'p' if reverse else 'n'}|{timestamp.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            direction, timestamp, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            timestamp = parse_datetime(timestamp)
+            if direction not in ('n', 'p') or timestamp is None:
+                raise ValueError
+            return direction == 'p', timestamp, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[0])
+
+        if reverse:
+            queryset = queryset.order_by('timestamp', 'id')
+        else:
+            queryset = queryset.order_by('-timestamp', '-id')
+        if cursor:
+            _, timestamp, pk = cursor
+            if reverse:
+                queryset = queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+
+        self.has_next = bool(page) and (has_more or reverse)
+        self.has_previous = bool(page) and (bool(cursor) and not reverse or has_more and reverse)
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(False, last.timestamp, last.id))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        first = self.page[0]
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(True, first.timestamp, first.id))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
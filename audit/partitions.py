@@ -0,0 +1,152 @@
+"""
+Monthly range partitioning of ``audit_auditlog`` on PostgreSQL.
+
+Partitions are named ``audit_auditlog_pYYYYMM`` and cover one calendar
+month in UTC. Dropping a whole expired partition is how retention stays
+cheap on PostgreSQL; other databases use the batched delete path in
+``audit.retention``.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from .models import AuditLog
+
+TABLE = AuditLog._meta.db_table
+PARTITION_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(start):
+    return f'{TABLE}_p{start:%Y%m}'
+
+
+def list_partitions():
+    """
+    Return ``(name, start, end)`` for every monthly partition, oldest first.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s AND pg_table_is_visible(p.oid)',
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+            partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(cursor, start):
+    end = add_months(start, 1)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {TABLE} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(now, months_ahead=2):
+    """
+    Create the partitions for the current month and ``months_ahead`` more.
+    """
+    start = month_start(now)
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            create_partition(cursor, add_months(start, offset))
+
+
+def drop_partition(name):
+    """
+    Detach and drop one partition. Only takes locks on that partition's month.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        cursor.execute(f'DROP TABLE {name}')
+
+
+def convert_to_partitioned(now, months_ahead=2):
+    """
+    Rebuild ``audit_auditlog`` as a table partitioned by month on ``timestamp``.
+
+    Runs in one transaction holding an exclusive lock on the table, so it
+    should be done in a maintenance window. The primary key becomes
+    ``(id, timestamp)`` because PostgreSQL requires the partition key in
+    every unique constraint; ``id`` stays an identity column and Django
+    keeps treating it as the primary key.
+    """
+    legacy = f'{TABLE}_legacy'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            'SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN("timestamp") FROM {TABLE}')
+        oldest = cursor.fetchone()[0] or now
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, "timestamp")')
+
+        start = month_start(oldest)
+        last = add_months(month_start(now), months_ahead)
+        while start <= last:
+            create_partition(cursor, start)
+            start = add_months(start, 1)
+        # Catches rows past the last monthly partition if ensure_partitions
+        # stops running, rather than failing audit inserts.
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {TABLE} OVERRIDING SYSTEM VALUE SELECT * FROM {legacy}')
+        cursor.execute(f'DROP TABLE {legacy}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}"
+        )
+
+        # Constraint and index names are free again now that the legacy
+        # table is gone; the definitions were read before the rename, so
+        # they already point at the new parent table.
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for definition in index_definitions:
+            cursor.execute(definition)
@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from . import partitions
+from .models import AuditLog
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'action', 'content_type_id', 'object_id', 'object_repr',
+    'changes', 'ip_address', 'user_agent', 'timestamp', 'additional_data',
+]
+
+
+def get_retention_days():
+    return getattr(settings, 'AUDIT_RETENTION_DAYS', 90)
+
+
+def get_archive_dir():
+    return getattr(settings, 'AUDIT_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archives', 'audit'))
+
+
+class ArchiveWriter:
+    """
+    Append audit rows to a gzip-compressed JSONL file.
+
+    ``sync`` flushes the compressor and fsyncs the file, so rows are on disk
+    before the matching database rows are deleted.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.raw = open(path, 'ab')
+        self.gzip = gzip.GzipFile(fileobj=self.raw, mode='ab')
+        self.rows = 0
+
+    def write(self, row):
+        self.gzip.write((json.dumps(row, cls=DjangoJSONEncoder) + '\n').encode('utf-8'))
+        self.rows += 1
+
+    def sync(self):
+        self.gzip.flush()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+
+    def close(self):
+        self.gzip.close()
+        self.raw.close()
+
+
+def archive_batched(cutoff, writer, batch_size=5000, dry_run=False, since=None):
+    """
+    Archive and delete rows older than ``cutoff`` in bounded batches.
+
+    Works on any database. Each batch is read in ``(timestamp, id)`` order,
+    written to the archive, synced, and then deleted in its own short
+    transaction, so no lock is held for longer than one batch. Rows before
+    ``since`` are skipped.
+    """
+    expired = AuditLog.objects.filter(timestamp__lt=cutoff).order_by('timestamp', 'id')
+    if since is not None:
+        expired = expired.filter(timestamp__gte=since)
+    last = None
+    archived = 0
+    while True:
+        batch_qs = expired
+        if last is not None:
+            batch_qs = batch_qs.filter(Q(timestamp__gt=last[0]) | Q(timestamp=last[0], id__gt=last[1]))
+        rows = list(batch_qs.values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return archived
+
+        for row in rows:
+            if writer is not None:
+                writer.write(row)
+        if writer is not None:
+            writer.sync()
+        if not dry_run:
+            with transaction.atomic():
+                AuditLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        last = (rows[-1]['timestamp'], rows[-1]['id'])
+        archived += len(rows)
+
+
+def archive_partitions(cutoff, writer, batch_size=5000, dry_run=False):
+    """
+    Archive and drop whole monthly partitions that end before ``cutoff``.
+
+    Rows are streamed with a server-side cursor, and the partition is then
+    detached and dropped instead of deleted row by row. Rows newer than the
+    newest fully expired partition are handled by ``archive_batched``; the
+    returned ``since`` is where that pass should start.
+    """
+    archived = 0
+    dropped = []
+    since = None
+    for name, start, end in partitions.list_partitions():
+        if end > cutoff:
+            break
+        rows = (
+            AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp', 'id')
+            .values(*ARCHIVE_FIELDS)
+            .iterator(chunk_size=batch_size)
+        )
+        for row in rows:
+            if writer is not None:
+                writer.write(row)
+            archived += 1
+        if writer is not None:
+            writer.sync()
+        if not dry_run:
+            partitions.drop_partition(name)
+        dropped.append(name)
+        since = end
+    return archived, dropped, since
@@ -13,3 +13,11 @@ class AuditLogSerializer(serializers.ModelSerializer):
             'timestamp', 'additional_data'
         ]
         read_only_fields = ['__all__']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user').only(
+            'id', 'user__username', 'user__role', 'action',
+            'object_repr', 'changes', 'ip_address', 'user_agent',
+            'timestamp', 'additional_data'
+        )
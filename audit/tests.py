@@ -0,0 +1,27 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from accounts.models import User
+from audit.models import AuditLog
+
+
+class AuditLogListQueryCountTests(APITestCase):
+    """
+    The audit log list runs a fixed number of queries however many rows
+    it returns.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_user('auditor', role='admin')
+        self.client.force_authenticate(self.admin)
+
+    def test_audit_log_list(self):
+        for total in (1, 5):
+            while AuditLog.objects.count() < total:
+                user = User.objects.create_user(f'actor-{AuditLog.objects.count()}', role='engineer')
+                AuditLog.objects.create(user=user, action='UPDATE', object_repr='core-0', changes={'status': 'online'})
+            # Keyset pagination: just the page, no count.
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('audit-logs'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), total)
+            self.assertTrue(all(row['user_role'] == 'engineer' for row in response.data['results']))
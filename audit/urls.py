@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('logs/', views.AuditLogListView.as_view(), name='audit-logs'),
+    path('logs/export/', views.AuditLogExportView.as_view(), name='audit-log-export'),
+    path('writer/', views.audit_writer_stats, name='audit-writer-stats'),
 ]
@@ -1,15 +1,25 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from devices.exports import AUDIT_EXPORT_COLUMNS, CSVRenderer, NDJSONRenderer, export_response
+from .filters import AuditLogFilter
 from .models import AuditLog
+from .pagination import TimestampCursorPagination
 from .serializers import AuditLogSerializer
+from .writer import get_audit_writer
 
 class AuditLogListView(generics.ListAPIView):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    ordering = ['-timestamp']
+    pagination_class = TimestampCursorPagination
+    # Ordering is fixed by the keyset pagination, so no OrderingFilter here.
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuditLogFilter
 
     def get_queryset(self):
-        queryset = AuditLog.objects.all()
+        queryset = AuditLogSerializer.setup_eager_loading(AuditLog.objects.all())
         
         # ساده filtering برای admin
         if self.request.user.role == 'admin':
@@ -17,3 +27,30 @@ class AuditLogListView(generics.ListAPIView):
         else:
             # کاربران عادی فقط لاگ‌های خودشان را می‌بینند
             return queryset.filter(user=self.request.user)
+
+class AuditLogExportView(generics.GenericAPIView):
+    """
+    Stream audit logs as NDJSON or CSV, oldest first, with the list filters.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuditLogFilter
+
+    def get_queryset(self):
+        queryset = AuditLog.objects.order_by('timestamp', 'id')
+        if self.request.user.role == 'admin':
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, AUDIT_EXPORT_COLUMNS, request.accepted_renderer.format, 'audit-logs')
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def audit_writer_stats(request):
+    if request.user.role != 'admin':
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    writer = get_audit_writer()
+    return Response({**writer.stats, 'queued': writer.queue.qsize()})
@@ -0,0 +1,137 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connection
+from .models import AuditLog
+
+
+class AuditLogWriter:
+    """
+    Buffer audit entries in a bounded queue and write them in batches.
+
+    ``enqueue`` never touches the database. A background thread drains the
+    queue and calls ``bulk_create`` once ``batch_size`` entries are waiting
+    or ``flush_interval`` seconds have passed. When the queue is full the
+    caller waits at most ``put_timeout`` seconds, then the entry is dropped
+    and counted.
+    """
+
+    def __init__(self, maxsize=10000, batch_size=200, flush_interval=1.0, put_timeout=0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _ensure_started(self):
+        # Started lazily and per process, so a writer created before a
+        # pre-fork server forks still gets a thread in every worker.
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def enqueue(self, entry):
+        self._ensure_started()
+        try:
+            if self.put_timeout:
+                self.queue.put(entry, timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait(entry)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _drain(self, batch, deadline):
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _write(self, batch):
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            AuditLog.objects.bulk_create(batch)
+        except Exception:
+            # Audit logging must never take the application down with it.
+            self._count('failed', len(batch))
+        else:
+            self._count('written', len(batch))
+            self._count('batches')
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                batch = []
+                self._drain(batch, time.monotonic() + self.flush_interval)
+                self._write(batch)
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """
+        Write everything currently queued, in batches, from the calling thread.
+        """
+        while True:
+            batch = []
+            self._drain(batch, 0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=5):
+        """
+        Stop the background thread after it has flushed the queue.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        else:
+            self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """
+    Return the process-wide audit writer, creating it on first use.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditLogWriter(
+                maxsize=getattr(settings, 'AUDIT_QUEUE_MAXSIZE', 10000),
+                batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 200),
+                flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+                put_timeout=getattr(settings, 'AUDIT_QUEUE_PUT_TIMEOUT', 0),
+            )
+            atexit.register(_writer.stop)
+        return _writer
@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.utils import timezone
+from .config_store import save_backups
+from .models import BackupRun, ConfigBackup, Device
+from .utils import fetch_device_config
+
+
+def get_backup_workers():
+    return getattr(settings, 'CONFIG_BACKUP_WORKERS', 50)
+
+
+def get_backup_timeout():
+    return getattr(settings, 'CONFIG_BACKUP_TIMEOUT', 60)
+
+
+def create_backup_run(queryset=None, user=None):
+    if queryset is None:
+        queryset = Device.objects.all()
+    device_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    return BackupRun.objects.create(device_ids=device_ids, total=len(device_ids), started_by=user)
+
+
+def _fetch(device, timeout):
+    """
+    Fetch one config within ``timeout`` seconds of wall-clock time, from
+    waiting for a pooled session to the last byte of output.
+
+    Returns ``(success, output, duration, timed_out)``.
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    try:
+        success, output = fetch_device_config(device, timeout=timeout, deadline=deadline)
+    except Exception as e:
+        success, output = False, str(e)
+    timed_out = not success and time.monotonic() >= deadline
+    if timed_out:
+        output = f'Timed out after {timeout}s: {output}'
+    return success, output, time.perf_counter() - started, timed_out
+
+
+def run_backup(run, max_workers=None, timeout=None, batch_size=200, stragglers=10):
+    """
+    Back up every device in ``run`` that does not have a backup in it yet.
+
+    Configs are fetched on a bounded thread pool, each within its own
+    wall-clock timeout, and written with ``save_backups`` in batches of
+    ``batch_size``. Running it again on the same run resumes: devices
+    already backed up are skipped and earlier failures are retried.
+    Returns the run report with throughput and the slowest devices.
+    """
+    if max_workers is None:
+        max_workers = get_backup_workers()
+    if timeout is None:
+        timeout = get_backup_timeout()
+
+    done_ids = set(ConfigBackup.objects.filter(run=run).values_list('device_id', flat=True))
+    pending_ids = [device_id for device_id in run.device_ids if device_id not in done_ids]
+    devices = list(
+        Device.objects.filter(id__in=pending_ids)
+        .only('id', 'name', 'ip_address', 'ssh_port', 'ssh_username', 'ssh_password', 'vendor')
+    )
+
+    run.status = 'running'
+    run.succeeded = len(done_ids)
+    run.errors = {}
+    run.save(update_fields=['status', 'succeeded', 'errors'])
+
+    started = time.perf_counter()
+    durations = []
+    timed_out = []
+    pending_writes = []
+
+    def flush():
+        save_backups(pending_writes, run=run, user=run.started_by)
+        run.succeeded += len(pending_writes)
+        run.failed = len(run.errors)
+        run.save(update_fields=['succeeded', 'failed', 'errors'])
+        pending_writes.clear()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(devices)))) as executor:
+            futures = {executor.submit(_fetch, device, timeout): device for device in devices}
+            for future in as_completed(futures):
+                device = futures[future]
+                success, output, duration, expired = future.result()
+                durations.append((duration, device.name))
+                if expired:
+                    timed_out.append(device.name)
+                if success:
+                    pending_writes.append((device.id, output))
+                else:
+                    run.errors[str(device.id)] = output
+                if len(pending_writes) >= batch_size:
+                    flush()
+        flush()
+    except BaseException:
+        run.status = 'failed'
+        run.save(update_fields=['status'])
+        raise
+
+    elapsed = time.perf_counter() - started
+    durations.sort(reverse=True)
+    run.report = {
+        'attempted': len(devices),
+        'skipped': len(done_ids),
+        'duration': round(elapsed, 3),
+        'throughput': round(len(devices) / elapsed, 2) if elapsed > 0 else 0,
+        'timeout': timeout,
+        'timed_out': timed_out,
+        'stragglers': [
+            {'device': name, 'seconds': round(duration, 3)} for duration, name in durations[:stragglers]
+        ],
+    }
+    run.status = 'completed' if not run.errors else 'failed'
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'report', 'finished_at'])
+    return run.report
+
+
+def run_backup_job(run_id):
+    """
+    Job entry point; claims the run so a duplicate delivery is a no-op.
+    """
+    claimed = BackupRun.objects.filter(id=run_id, status='pending').update(status='running')
+    if not claimed:
+        return
+    run_backup(BackupRun.objects.select_related('started_by').get(id=run_id))
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.utils import timezone
+from .events import command_events, record_events
+from .models import DeviceCommand
+from .utils import execute_ssh_command
+
+
+def get_bulk_max_workers():
+    return getattr(settings, 'BULK_COMMAND_MAX_WORKERS', 50)
+
+
+def apply_result(command_obj, success, output):
+    command_obj.status = 'completed' if success else 'failed'
+    command_obj.output = output if success else ''
+    command_obj.error_message = '' if success else output
+    command_obj.completed_at = timezone.now()
+
+
+def run_bulk_command(devices, command, user, max_workers=None, flush_every=50):
+    """
+    Run ``command`` on every device concurrently and yield results as they finish.
+
+    One ``DeviceCommand`` row per device is created up front with a single
+    ``bulk_create``; finished rows are written back with ``bulk_update`` every
+    ``flush_every`` results and once more at the end, even if the consumer
+    stops iterating early.
+    """
+    if max_workers is None:
+        max_workers = get_bulk_max_workers()
+
+    devices = list(devices)
+    command_objs = DeviceCommand.objects.bulk_create([
+        DeviceCommand(device=device, command=command, status='running', executed_by=user)
+        for device in devices
+    ])
+
+    pending_writes = []
+
+    def flush():
+        if pending_writes:
+            DeviceCommand.objects.bulk_update(
+                pending_writes, ['status', 'output', 'error_message', 'completed_at']
+            )
+            record_events(command_events(pending_writes))
+            pending_writes.clear()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(devices))))
+    futures = {
+        executor.submit(execute_ssh_command, device, command): (device, command_obj)
+        for device, command_obj in zip(devices, command_objs)
+    }
+    try:
+        for future in as_completed(futures):
+            device, command_obj = futures[future]
+            apply_result(command_obj, *future.result())
+            pending_writes.append(command_obj)
+            if len(pending_writes) >= flush_every:
+                flush()
+
+            yield {
+                'id': command_obj.id,
+                'device_id': device.id,
+                'device_name': device.name,
+                'status': command_obj.status,
+                'output': command_obj.output,
+                'error_message': command_obj.error_message,
+                'completed_at': command_obj.completed_at.isoformat(),
+            }
+    finally:
+        executor.shutdown(wait=True)
+        # The consumer may have stopped early; record what still finished.
+        for future, (device, command_obj) in futures.items():
+            if command_obj.status == 'running':
+                apply_result(command_obj, *future.result())
+                pending_writes.append(command_obj)
+        flush()
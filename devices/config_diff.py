@@ -0,0 +1,267 @@
+import difflib
+from bisect import bisect_left
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+
+# Gaps between unique-line anchors smaller than this go straight to difflib.
+SMALL_GAP = 64
+
+
+def get_diff_cache_ttl():
+    return getattr(settings, 'CONFIG_DIFF_CACHE_TTL', 3600)
+
+
+def _longest_increasing_run(pairs):
+    """
+    Return the longest subsequence of ``(i, j)`` pairs with increasing ``j``.
+
+    ``pairs`` is already sorted by ``i``; this is patience sorting in
+    O(n log n), with a linear fast path for the common case where the
+    anchors are already in order.
+    """
+    if all(first[1] < second[1] for first, second in zip(pairs, pairs[1:])):
+        return pairs
+    tails = []
+    tail_index = []
+    back = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[position] = j
+            tail_index[position] = index
+        back[index] = tail_index[position - 1] if position else None
+
+    run = []
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        run.append(pairs[index])
+        index = back[index]
+    run.reverse()
+    return run
+
+
+def _emit(opcodes, tag, i1, i2, j1, j2):
+    if i1 == i2 and j1 == j2:
+        return
+    if opcodes and opcodes[-1][0] == tag and opcodes[-1][2] == i1 and opcodes[-1][4] == j1:
+        opcodes[-1] = (tag, opcodes[-1][1], i2, opcodes[-1][3], j2)
+    else:
+        opcodes.append((tag, i1, i2, j1, j2))
+
+
+def _diff_range(a, b, alo, ahi, blo, bhi, opcodes):
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    _emit(opcodes, 'equal', start, alo, blo - (alo - start), blo)
+    end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+
+    if alo == ahi or blo == bhi:
+        _emit(opcodes, 'delete', alo, ahi, blo, blo)
+        _emit(opcodes, 'insert', alo, alo, blo, bhi)
+    else:
+        anchors = []
+        if ahi - alo > SMALL_GAP or bhi - blo > SMALL_GAP:
+            counts_a = Counter(a[alo:ahi])
+            counts_b = Counter(b[blo:bhi])
+            positions_b = {
+                line: j for j, line in enumerate(b[blo:bhi], blo)
+                if counts_b[line] == 1 and counts_a[line] == 1
+            }
+            anchors = _longest_increasing_run([
+                (i, positions_b[line]) for i, line in enumerate(a[alo:ahi], alo) if line in positions_b
+            ])
+
+        if anchors:
+            for i, j in anchors:
+                if i > alo or j > blo:
+                    _diff_range(a, b, alo, i, blo, j, opcodes)
+                _emit(opcodes, 'equal', i, i + 1, j, j + 1)
+                alo, blo = i + 1, j + 1
+            _diff_range(a, b, alo, ahi, blo, bhi, opcodes)
+        else:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi])
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                _emit(opcodes, tag, alo + i1, alo + i2, blo + j1, blo + j2)
+
+    _emit(opcodes, 'equal', ahi, end, bhi, bhi + (end - ahi))
+
+
+def diff_opcodes(a, b):
+    """
+    Compute ``difflib``-style opcodes between two lists of lines.
+
+    Uses patience diff: lines that occur exactly once on both sides anchor
+    the alignment and only the gaps between anchors are diffed. Config
+    files are mostly unique lines, so this is close to linear where
+    ``difflib.SequenceMatcher`` on the whole file is not.
+    """
+    opcodes = []
+    _diff_range(a, b, 0, len(a), 0, len(b), opcodes)
+    return opcodes or [('equal', 0, 0, 0, 0)]
+
+
+def _grouped_opcodes(opcodes, context):
+    # Same grouping as difflib.SequenceMatcher.get_grouped_opcodes().
+    codes = list(opcodes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start, stop):
+    """
+    Format a ``[start, stop)`` line range for a unified diff hunk header.
+
+    Lines are numbered from 1 and a one-line range is just its number.
+    An empty range names the line before it, so an insertion at the top
+    of the file is ``0,0``.
+    """
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def unified_diff(old_text, new_text, from_label='a', to_label='b', context=3):
+    """
+    Return a unified diff of two config texts and its added/removed counts.
+    """
+    a = old_text.splitlines()
+    b = new_text.splitlines()
+    lines = []
+    added = removed = 0
+    for group in _grouped_opcodes(diff_opcodes(a, b), context):
+        if not lines:
+            lines.append(f'--- {from_label}')
+            lines.append(f'+++ {to_label}')
+        first, last = group[0], group[-1]
+        old_range = _format_range(first[1], last[2])
+        new_range = _format_range(first[3], last[4])
+        lines.append(f'@@ -{old_range} +{new_range} @@')
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend(' ' + line for line in a[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                lines.extend('-' + line for line in a[i1:i2])
+                removed += i2 - i1
+            if tag in ('replace', 'insert'):
+                lines.extend('+' + line for line in b[j1:j2])
+                added += j2 - j1
+    return '\n'.join(lines), {'added': added, 'removed': removed}
+
+
+def parse_sections(text):
+    """
+    Split a config into top-level sections.
+
+    A line that is not indented starts a section and the indented lines
+    below it are its body, which matches IOS/EOS/ProCurve style configs.
+    ``!`` and ``#`` comment lines are skipped. Repeated headers are told
+    apart by an occurrence counter so that ordering is preserved.
+    """
+    sections = {}
+    seen = Counter()
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(('!', '#')):
+            continue
+        if line[:1].isspace() and current is not None:
+            sections[current].append(stripped)
+            continue
+        seen[stripped] += 1
+        current = (stripped, seen[stripped])
+        sections[current] = []
+    return sections
+
+
+def _only_in(lines, other):
+    extra = Counter(lines) - Counter(other)
+    result = []
+    for line in lines:
+        if extra[line]:
+            extra[line] -= 1
+            result.append(line)
+    return result
+
+
+def structured_diff(old_text, new_text):
+    """
+    Diff two configs section by section.
+    """
+    old_sections = parse_sections(old_text)
+    new_sections = parse_sections(new_text)
+
+    added = [
+        {'section': key[0], 'lines': body}
+        for key, body in new_sections.items() if key not in old_sections
+    ]
+    removed = [
+        {'section': key[0], 'lines': body}
+        for key, body in old_sections.items() if key not in new_sections
+    ]
+    changed = []
+    for key, new_body in new_sections.items():
+        old_body = old_sections.get(key)
+        if old_body is None or old_body == new_body:
+            continue
+        changed.append({
+            'section': key[0],
+            'added': _only_in(new_body, old_body),
+            'removed': _only_in(old_body, new_body),
+        })
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'stats': {'added': len(added), 'removed': len(removed), 'changed': len(changed)},
+    }
+
+
+def cached_diff(old_hash, new_hash, load_texts, diff_format='unified', context=3):
+    """
+    Diff two configs identified by content hash, caching the result.
+
+    ``load_texts`` is only called on a cache miss, so a cached diff never
+    reads the config bodies.
+    """
+    key = f'config-diff:{diff_format}:{context}:{old_hash}:{new_hash}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    old_text, new_text = load_texts()
+    if diff_format == 'structured':
+        result = structured_diff(old_text, new_text)
+    else:
+        diff, stats = unified_diff(old_text, new_text, old_hash[:12], new_hash[:12], context)
+        result = {'diff': diff, 'stats': stats}
+    cache.set(key, result, timeout=get_diff_cache_ttl())
+    return result
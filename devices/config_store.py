@@ -0,0 +1,101 @@
+import hashlib
+import zlib
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from .models import ConfigBackup, ConfigBlob, Device
+
+
+def hash_config(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def store_config(text):
+    """
+    Return the ``ConfigBlob`` for ``text``, creating it only if it is new.
+
+    Identical configs share one compressed row however many devices or
+    backups refer to them.
+    """
+    sha256 = hash_config(text)
+    blob = ConfigBlob.objects.filter(sha256=sha256).defer('data').first()
+    if blob is not None:
+        return blob
+    encoded = text.encode('utf-8')
+    blob, _ = ConfigBlob.objects.get_or_create(
+        sha256=sha256,
+        defaults={'data': zlib.compress(encoded, 6), 'size': len(encoded)},
+    )
+    return blob
+
+
+def save_backup(device, text, user=None):
+    """
+    Record a backup of ``device``'s config.
+
+    An unchanged config costs one small ``ConfigBackup`` row pointing at the
+    blob that is already stored.
+    """
+    blob = store_config(text)
+    previous_blob_id = (
+        ConfigBackup.objects.filter(device=device).order_by('-taken_at', '-id')
+        .values_list('blob_id', flat=True).first()
+    )
+    return ConfigBackup.objects.create(
+        device=device,
+        blob=blob,
+        changed=previous_blob_id != blob.id,
+        taken_by=user,
+    )
+
+
+def store_configs(texts):
+    """
+    Return ``{sha256: blob_id}`` for many config texts in a constant number of queries.
+    """
+    by_hash = {hash_config(text): text for text in texts}
+    blob_ids = dict(
+        ConfigBlob.objects.filter(sha256__in=by_hash).values_list('sha256', 'id')
+    )
+    missing = []
+    for sha256, text in by_hash.items():
+        if sha256 not in blob_ids:
+            encoded = text.encode('utf-8')
+            missing.append(ConfigBlob(sha256=sha256, data=zlib.compress(encoded, 6), size=len(encoded)))
+    if missing:
+        # Another writer may insert the same blob meanwhile; re-read the ids.
+        ConfigBlob.objects.bulk_create(missing, ignore_conflicts=True)
+        blob_ids.update(
+            ConfigBlob.objects.filter(sha256__in=[blob.sha256 for blob in missing]).values_list('sha256', 'id')
+        )
+    return blob_ids
+
+
+def save_backups(results, run=None, user=None):
+    """
+    Record backups for many devices at once.
+
+    ``results`` is a list of ``(device_id, config_text)``. Blobs, previous
+    backups and the new ``ConfigBackup`` rows each take one query, however
+    many devices are in the batch.
+    """
+    if not results:
+        return []
+    with transaction.atomic():
+        blob_ids = store_configs([text for _, text in results])
+        latest = ConfigBackup.objects.filter(device=OuterRef('pk')).order_by('-taken_at').values('blob_id')[:1]
+        previous = dict(
+            Device.objects.filter(id__in=[device_id for device_id, _ in results])
+            .annotate(previous_blob_id=Subquery(latest))
+            .values_list('id', 'previous_blob_id')
+        )
+        backups = []
+        for device_id, text in results:
+            blob_id = blob_ids[hash_config(text)]
+            backups.append(ConfigBackup(
+                device_id=device_id,
+                blob_id=blob_id,
+                changed=previous.get(device_id) != blob_id,
+                run=run,
+                taken_by=user,
+            ))
+        return ConfigBackup.objects.bulk_create(backups)
@@ -0,0 +1,400 @@
+"""
+Live device events for dashboards, delivered as Server-Sent Events.
+
+Producers (the status sweep and command completion) append ``StatusEvent``
+rows. In each web process one ``EventBroadcaster`` thread polls for rows
+newer than the last it saw and hands them to every subscriber's queue, so
+the database cost is one indexed query per poll interval no matter how
+many dashboards are connected. Event ids are the row ids; a reconnecting
+client sends ``Last-Event-ID`` and gets the events it missed replayed from
+the table first. Ids are not committed in order, so events can arrive
+out of id order and a resumed stream can repeat recent ones; clients
+should key on the id.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .models import StatusEvent
+
+
+def get_poll_interval():
+    return getattr(settings, 'STATUS_STREAM_POLL_INTERVAL', 1.0)
+
+
+def get_heartbeat():
+    return getattr(settings, 'STATUS_STREAM_HEARTBEAT', 15)
+
+
+def get_max_duration():
+    return getattr(settings, 'STATUS_STREAM_MAX_DURATION', 3600)
+
+
+def get_max_clients():
+    return getattr(settings, 'STATUS_STREAM_MAX_CLIENTS', 4)
+
+
+def get_settle_window():
+    return getattr(settings, 'STATUS_STREAM_SETTLE_WINDOW', 60)
+
+
+def get_retention_hours():
+    return getattr(settings, 'STATUS_EVENT_RETENTION_HOURS', 24)
+
+
+def status_change_events(changes):
+    """
+    Build events for ``(device_id, previous_status, status)`` transitions.
+    """
+    return [
+        StatusEvent(
+            kind='status',
+            device_id=device_id,
+            data={'device_id': device_id, 'previous_status': previous, 'status': current},
+        )
+        for device_id, previous, current in changes
+    ]
+
+
+def command_events(command_objs):
+    """
+    Build events for finished ``DeviceCommand`` rows.
+    """
+    return [
+        StatusEvent(
+            kind='command',
+            device_id=command_obj.device_id,
+            data={
+                'command_id': command_obj.id,
+                'device_id': command_obj.device_id,
+                'status': command_obj.status,
+                'completed_at': command_obj.completed_at,
+            },
+        )
+        for command_obj in command_objs
+    ]
+
+
+def record_events(events):
+    if events:
+        StatusEvent.objects.bulk_create(events)
+
+
+def prune_status_events(now=None):
+    """
+    Delete events older than ``STATUS_EVENT_RETENTION_HOURS``.
+    """
+    if now is None:
+        now = timezone.now()
+    cutoff = now - timedelta(hours=get_retention_hours())
+    return StatusEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+
+
+def format_event(event_id, kind, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """
+    One client's view of the stream: a bounded queue of ``(id, kind, data)``.
+
+    A client that falls ``maxsize`` events behind is marked ``overflowed``;
+    it should reconnect and resume from its last event id.
+    """
+
+    def __init__(self, start_id, maxsize=1000):
+        self.start_id = start_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroadcaster:
+    """
+    Poll ``StatusEvent`` once per interval and fan new rows out to subscribers.
+
+    The thread only queries while someone is subscribed.
+
+    Ids are allocated at insert but become visible at commit, so a row can
+    appear after rows with higher ids (the status sweep writes its events
+    inside a longer transaction than command completions). Ids skipped
+    over are kept as gaps for ``settle_window`` seconds and re-read on
+    every poll; a row that shows up in one is delivered late, out of id
+    order, and each row is still delivered once.
+    """
+
+    def __init__(self, poll_interval=1.0, batch_size=500, settle_window=60):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.settle_window = settle_window
+        self.subscribers = set()
+        self.last_id = None
+        self.gaps = []
+        self.stats = {'polls': 0, 'events': 0, 'late': 0}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started lazily and per process, like the audit writer.
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='status-events', daemon=True)
+        self._pid = os.getpid()
+        self._thread.start()
+
+    def _start_position(self):
+        """
+        The highest id so far, and the ids below it still uncommitted,
+        judged from the rows inserted within the settle window.
+        """
+        last_id = StatusEvent.objects.aggregate(last=Max('id'))['last'] or 0
+        since = timezone.now() - timedelta(seconds=self.settle_window)
+        recent = StatusEvent.objects.filter(created_at__gte=since).order_by('id').values_list('id', flat=True)
+        gaps = []
+        expires = time.monotonic() + self.settle_window
+        previous = None
+        for event_id in recent.iterator():
+            if previous is not None and event_id > previous + 1:
+                gaps.append([previous + 1, event_id - 1, expires])
+            previous = event_id
+        if previous is not None and last_id > previous:
+            gaps.append([previous + 1, last_id, expires])
+        return last_id, gaps
+
+    def subscribe(self):
+        """
+        Register a subscriber. Every event committed after this returns is
+        delivered to it, so a replay read afterwards cannot leave a gap.
+        """
+        with self._lock:
+            if self.last_id is None:
+                self.last_id, self.gaps = self._start_position()
+            subscription = Subscription(self.last_id)
+            self.subscribers.add(subscription)
+            self._ensure_started()
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscribers.discard(subscription)
+
+    def _take(self, event_id, now):
+        """
+        Account for a fetched row: record the ids it skips over as a gap,
+        or remove it from the gap it filled. Returns True if it was late.
+        """
+        if event_id > self.last_id:
+            if event_id > self.last_id + 1:
+                self.gaps.append([self.last_id + 1, event_id - 1, now + self.settle_window])
+            self.last_id = event_id
+            return False
+        for index, (low, high, expires) in enumerate(self.gaps):
+            if low <= event_id <= high:
+                split = [[low, event_id - 1, expires], [event_id + 1, high, expires]]
+                self.gaps[index:index + 1] = [gap for gap in split if gap[0] <= gap[1]]
+                break
+        return True
+
+    def poll(self):
+        now = time.monotonic()
+        with self._lock:
+            if not self.subscribers:
+                # Nobody is listening; the next subscriber starts from the top.
+                self.last_id = None
+                self.gaps = []
+                return 0
+            self.gaps = [gap for gap in self.gaps if gap[2] > now]
+            pending = Q(id__gt=self.last_id)
+            for low, high, _ in self.gaps:
+                pending |= Q(id__range=(low, high))
+        rows = list(
+            StatusEvent.objects.filter(pending)
+            .order_by('id')
+            .values_list('id', 'kind', 'data')[:self.batch_size]
+        )
+        with self._lock:
+            self.stats['polls'] += 1
+            self.stats['events'] += len(rows)
+            for row in rows:
+                if self._take(row[0], now):
+                    self.stats['late'] += 1
+            subscribers = list(self.subscribers)
+        for row in rows:
+            for subscription in subscribers:
+                subscription.put(row)
+        return len(rows)
+
+    def _run(self):
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    delivered = self.poll()
+                except Exception:
+                    # Keep streaming through transient database errors.
+                    delivered = 0
+                if delivered < self.batch_size:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+        finally:
+            connection.close()
+
+
+class StreamSlots:
+    """
+    A per-process cap on open streams.
+
+    A stream holds a web worker thread for as long as it is open, so
+    without a cap a few dashboards would take every thread the worker
+    has for API requests.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+class EventStream:
+    """
+    One client's response body. Its slot is released when the response
+    is closed, whether or not the stream was ever iterated.
+    """
+
+    def __init__(self, slots, last_event_id=None):
+        self.slots = slots
+        self._stream = event_stream(last_event_id)
+        self._released = False
+
+    def __iter__(self):
+        return self._stream
+
+    def close(self):
+        self._stream.close()
+        if not self._released:
+            self._released = True
+            self.slots.release()
+
+
+_broadcaster = None
+_slots = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_event_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = EventBroadcaster(poll_interval=get_poll_interval(), settle_window=get_settle_window())
+        return _broadcaster
+
+
+def get_stream_slots():
+    global _slots
+    with _broadcaster_lock:
+        if _slots is None:
+            _slots = StreamSlots(get_max_clients())
+        return _slots
+
+
+def replay_events(after_id, limit=1000):
+    """
+    Return up to ``limit`` stored events for a client resuming after
+    ``after_id``, and whether more were missed than that.
+
+    Rows inserted within the settle window before ``after_id`` may have
+    committed after the client saw it, so they are sent again along with
+    everything newer: a resumed client can get events it already has,
+    under the same ids, but does not lose any.
+    """
+    since = (
+        StatusEvent.objects.filter(id__lte=after_id)
+        .order_by('-id').values_list('created_at', flat=True).first()
+    )
+    start_id = after_id + 1
+    if since is not None:
+        window = StatusEvent.objects.filter(created_at__gte=since - timedelta(seconds=get_settle_window()))
+        start_id = min(start_id, window.aggregate(first=Min('id'))['first'] or start_id)
+    rows = list(
+        StatusEvent.objects.filter(id__gte=start_id)
+        .exclude(id=after_id)
+        .order_by('id')
+        .values_list('id', 'kind', 'data')[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def event_stream(last_event_id=None, heartbeat=None, max_duration=None):
+    """
+    Subscribe and yield the SSE response body for one client.
+
+    Missed events are replayed first when ``last_event_id`` is given; a
+    client too far behind for the replay gets a ``reset`` event and should
+    reload its state. The stream ends after ``max_duration`` seconds, or
+    as soon as the client falls too far behind, and the client reconnects
+    and resumes from its last event id.
+    """
+    if heartbeat is None:
+        heartbeat = get_heartbeat()
+    if max_duration is None:
+        max_duration = get_max_duration()
+    broadcaster = get_event_broadcaster()
+    subscription = broadcaster.subscribe()
+    deadline = time.monotonic() + max_duration
+    # Replayed rows can also arrive live; the broadcaster itself sends each row once.
+    replayed = set()
+    try:
+        yield 'retry: 3000\n\n'
+        if last_event_id is not None:
+            rows, truncated = replay_events(last_event_id)
+            if truncated:
+                yield format_event(subscription.start_id, 'reset', {'reason': 'too many missed events'})
+                rows = []
+            for event_id, kind, data in rows:
+                replayed.add(event_id)
+                yield format_event(event_id, kind, data)
+
+        while time.monotonic() < deadline and not subscription.overflowed:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            event_id, kind, data = event
+            if event_id in replayed:
+                continue
+            yield format_event(event_id, kind, data)
+    finally:
+        broadcaster.unsubscribe(subscription)
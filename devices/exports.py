@@ -0,0 +1,147 @@
+"""
+Streaming exports as NDJSON or CSV.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)``, which is
+a server-side cursor on PostgreSQL, and written straight into a
+``StreamingHttpResponse``; no model instances or serializers are built,
+so memory use does not grow with the size of the export.
+"""
+import csv
+import json
+from datetime import date, datetime
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+# Lines are joined into writes of about this many characters.
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# (column, lookup) pairs; lookups may follow foreign keys.
+DEVICE_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('device_type', 'device_type'),
+    ('ip_address', 'ip_address'),
+    ('mac_address', 'mac_address'),
+    ('location', 'location'),
+    ('vendor', 'vendor'),
+    ('model', 'model'),
+    ('os_version', 'os_version'),
+    ('status', 'status'),
+    ('ssh_port', 'ssh_port'),
+    ('ssh_username', 'ssh_username'),
+    ('description', 'description'),
+    ('created_by_username', 'created_by__username'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('last_seen', 'last_seen'),
+]
+COMMAND_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('device_id', 'device_id'),
+    ('device_name', 'device__name'),
+    ('command', 'command'),
+    ('status', 'status'),
+    ('output', 'output'),
+    ('error_message', 'error_message'),
+    ('executed_by_username', 'executed_by__username'),
+    ('executed_at', 'executed_at'),
+    ('completed_at', 'completed_at'),
+]
+AUDIT_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('action', 'action'),
+    ('object_repr', 'object_repr'),
+    ('changes', 'changes'),
+    ('ip_address', 'ip_address'),
+    ('user_agent', 'user_agent'),
+    ('timestamp', 'timestamp'),
+    ('additional_data', 'additional_data'),
+]
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Selects NDJSON exports (``?format=ndjson``); only errors are rendered here.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class CSVRenderer(NDJSONRenderer):
+    """
+    Selects CSV exports (``?format=csv``); errors are still rendered as JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class _Echo:
+    # csv.writer wants a file; this one hands each line back instead.
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def iter_ndjson(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    names = [name for name, _ in columns]
+    encoder = DjangoJSONEncoder()
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def iter_csv(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def buffered(lines, size=WRITE_BUFFER_SIZE):
+    """
+    Join small lines into larger chunks, so the server does not issue one
+    socket write per row.
+    """
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(queryset, columns, export_format, basename):
+    """
+    Stream ``queryset`` as ``ndjson`` or ``csv`` in a download response.
+    """
+    if export_format == 'csv':
+        body, content_type, extension = iter_csv(queryset, columns), 'text/csv', 'csv'
+    else:
+        body, content_type, extension = iter_ndjson(queryset, columns), 'application/x-ndjson', 'ndjson'
+    response = StreamingHttpResponse(buffered(body), content_type=content_type)
+    filename = f'{basename}-{timezone.now():%Y%m%dT%H%M%S}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,164 @@
+"""
+Device list filtering and search.
+
+Exact filters (``status``, ``device_type``, ``vendor``, ``ip_address``)
+hit plain b-tree indexes. ``subnet`` and IP-looking search terms become a
+network containment test: ``<<=`` on PostgreSQL, where the ``inet`` b-tree
+index answers it as a range scan, and a short list of ranges over the
+dotted text form elsewhere.
+
+Text search ANDs whitespace-separated terms and ORs each over ``name``,
+``location``, ``vendor`` and ``model``, matching anywhere in the value. A
+search made only of terms shorter than ``TRIGRAM_MIN_LENGTH`` matches them
+as prefixes instead, since a substring search on one or two characters
+cannot use a trigram index. On PostgreSQL both are served by the
+``pg_trgm`` GIN indexes created in migration 0008; other databases run
+the same lookups without them.
+"""
+import ipaddress
+import re
+import django_filters
+from django.db import NotSupportedError, connection
+from django.db.models import GenericIPAddressField, Lookup, Q
+from rest_framework.exceptions import ValidationError
+from .models import Device
+
+TRIGRAM_MIN_LENGTH = 3
+SEARCH_FIELDS = ['name', 'location', 'vendor', 'model']
+# One to four dotted-decimal octets, optionally with a trailing dot: "10.", "10.1.2".
+IP_PREFIX_PATTERN = re.compile(r'^\d{1,3}(\.\d{1,3}){0,3}\.?$')
+
+
+@GenericIPAddressField.register_lookup
+class InSubnet(Lookup):
+    """
+    ``ip_address__in_subnet=<ip_network>``: the address lies in the network.
+    """
+    lookup_name = 'in_subnet'
+    prepare_rhs = False
+
+    def process_rhs(self, compiler, connection):
+        # Networks are not addresses; skip the field's address validation.
+        return '%s', [str(self.rhs)]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} <<= {rhs}::cidr', lhs_params + rhs_params
+
+    def as_sql(self, compiler, connection):
+        # Addresses are stored as text here; match them on their octets.
+        if self.rhs.version != 4:
+            raise NotSupportedError('IPv6 subnet queries need PostgreSQL.')
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        exact, prefixes = ipv4_patterns(self.rhs)
+        clauses = []
+        params = []
+        if exact:
+            clauses.append(f'{lhs} IN ({", ".join(["%s"] * len(exact))})')
+            params += lhs_params + exact
+        for prefix in prefixes:
+            # A prefix as a range ('10.1.' <= ip < '10.1/'), so the b-tree
+            # index on the column can serve it.
+            clauses.append(f'({lhs} >= %s AND {lhs} < %s)')
+            params += lhs_params + [prefix] + lhs_params + [prefix[:-1] + '/' if prefix else '~']
+        return '(' + ' OR '.join(clauses) + ')', params
+
+
+def ipv4_patterns(network):
+    """
+    Return ``(exact, prefixes)`` matching the text form of every address in
+    an IPv4 ``network``: exact addresses, or prefixes ending in a dot.
+    """
+    octets = str(network.network_address).split('.')
+    whole, rest = divmod(network.prefixlen, 8)
+    fixed = octets[:whole]
+    if not rest:
+        if whole == 4:
+            return ['.'.join(fixed)], []
+        return [], ['.'.join(fixed) + '.' if fixed else '']
+    first = int(octets[whole])
+    values = [str(value) for value in range(first, first + 2 ** (8 - rest))]
+    if whole == 3:
+        return ['.'.join(fixed + [value]) for value in values], []
+    return [], ['.'.join(fixed + [value]) + '.' for value in values]
+
+
+def parse_network(value):
+    """
+    Parse a CIDR network or a single address; None if it is neither.
+    """
+    try:
+        return ipaddress.ip_network(value.strip(), strict=False)
+    except ValueError:
+        return None
+
+
+def search_network(term):
+    """
+    The network an IP-looking search term stands for, or None.
+
+    A partial dotted address is a prefix on whole octets, so ``10.1`` and
+    ``10.1.`` both mean ``10.1.0.0/16``.
+    """
+    if IP_PREFIX_PATTERN.match(term):
+        octets = term.rstrip('.').split('.')
+        if any(int(octet) > 255 for octet in octets):
+            return None
+        padded = octets + ['0'] * (4 - len(octets))
+        return ipaddress.ip_network(f'{".".join(padded)}/{8 * len(octets)}')
+    if '/' in term or ':' in term:
+        return parse_network(term)
+    return None
+
+
+def supports_network(network):
+    return network.version == 4 or connection.vendor == 'postgresql'
+
+
+def text_search_q(term, prefix):
+    lookup = 'istartswith' if prefix else 'icontains'
+    query = Q()
+    for field in SEARCH_FIELDS:
+        query |= Q(**{f'{field}__{lookup}': term})
+    return query
+
+
+class DeviceFilter(django_filters.FilterSet):
+    status = django_filters.MultipleChoiceFilter(choices=Device.STATUS_CHOICES)
+    device_type = django_filters.MultipleChoiceFilter(choices=Device.DEVICE_TYPES)
+    ip_address = django_filters.CharFilter(method='filter_ip_address')
+    subnet = django_filters.CharFilter(method='filter_subnet')
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Device
+        fields = ['status', 'device_type', 'vendor', 'ip_address']
+
+    def filter_ip_address(self, queryset, name, value):
+        try:
+            address = ipaddress.ip_address(value.strip())
+        except ValueError:
+            raise ValidationError({'ip_address': ['Enter a valid IPv4 or IPv6 address.']})
+        return queryset.filter(ip_address=str(address))
+
+    def filter_subnet(self, queryset, name, value):
+        network = parse_network(value)
+        if network is None:
+            raise ValidationError({'subnet': ['Enter a valid network, e.g. 10.0.0.0/24.']})
+        if not supports_network(network):
+            raise ValidationError({'subnet': ['IPv6 subnet queries need PostgreSQL.']})
+        return queryset.filter(ip_address__in_subnet=network)
+
+    def filter_search(self, queryset, name, value):
+        terms = value.replace(',', ' ').split()
+        # Short terms only need to be prefixes when no longer term can
+        # narrow the search through the trigram index first.
+        prefix = all(len(term) < TRIGRAM_MIN_LENGTH for term in terms)
+        for term in terms:
+            query = text_search_q(term, prefix)
+            network = search_network(term)
+            if network is not None and supports_network(network):
+                query |= Q(ip_address__in_subnet=network)
+            queryset = queryset.filter(query)
+        return queryset
@@ -0,0 +1,243 @@
+"""
+Device health history.
+
+Every status sweep stores one ``HealthSample`` per device. ``rollup_health``
+folds samples into 1-minute ``HealthRollup`` buckets, 1-minute buckets into
+hourly ones and hourly into daily ones; ``prune_health`` then drops each
+level once it is older than its retention. Range queries only read
+rollups, picking the finest resolution that is still retained and keeps
+the series short.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import HealthRollup, HealthSample
+
+# (resolution, Trunc kind, source resolution); None means raw samples.
+LEVELS = [
+    (HealthRollup.MINUTE, 'minute', None),
+    (HealthRollup.HOUR, 'hour', HealthRollup.MINUTE),
+    (HealthRollup.DAY, 'day', HealthRollup.HOUR),
+]
+RESOLUTION_NAMES = {name: seconds for seconds, name in HealthRollup.RESOLUTIONS}
+COUNTERS = ['samples', 'reachable', 'port_open', 'latency_count', 'latency_sum', 'latency_min', 'latency_max']
+MAX_POINTS = 500
+
+
+def get_retention():
+    """
+    Return retention as ``{resolution: timedelta}``; key ``None`` is raw samples.
+    """
+    return {
+        None: timedelta(days=getattr(settings, 'HEALTH_SAMPLE_RETENTION_DAYS', 2)),
+        HealthRollup.MINUTE: timedelta(days=getattr(settings, 'HEALTH_MINUTE_RETENTION_DAYS', 14)),
+        HealthRollup.HOUR: timedelta(days=getattr(settings, 'HEALTH_HOUR_RETENTION_DAYS', 180)),
+        HealthRollup.DAY: timedelta(days=getattr(settings, 'HEALTH_DAY_RETENTION_DAYS', 1825)),
+    }
+
+
+def floor_time(value, resolution):
+    epoch = int(value.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % resolution, tz=dt_timezone.utc)
+
+
+def record_health_samples(results, sampled_at, batch_size=1000):
+    """
+    Store one sample per ``ProbeResult`` from a sweep.
+    """
+    HealthSample.objects.bulk_create(
+        [
+            HealthSample(
+                device_id=result.device_id,
+                sampled_at=sampled_at,
+                reachable=result.reachable,
+                port_open=result.port_open,
+                latency=result.latency,
+            )
+            for result in results
+        ],
+        batch_size=batch_size,
+    )
+
+
+def _aggregate(source, kind, start, end):
+    utc = dt_timezone.utc
+    if source is None:
+        rows = HealthSample.objects.filter(sampled_at__gte=start, sampled_at__lt=end).annotate(
+            period=Trunc('sampled_at', kind, tzinfo=utc),
+        ).values('device_id', 'period').annotate(
+            samples=Count('id'),
+            reachable_count=Count('id', filter=Q(reachable=True)),
+            port_open_count=Count('id', filter=Q(port_open=True)),
+            latency_count=Count('latency'),
+            latency_total=Sum('latency'),
+            latency_low=Min('latency'),
+            latency_high=Max('latency'),
+        )
+    else:
+        rows = HealthRollup.objects.filter(resolution=source, bucket__gte=start, bucket__lt=end).annotate(
+            period=Trunc('bucket', kind, tzinfo=utc),
+        ).values('device_id', 'period').annotate(
+            samples_total=Sum('samples'),
+            reachable_count=Sum('reachable'),
+            port_open_count=Sum('port_open'),
+            latency_total_count=Sum('latency_count'),
+            latency_total=Sum('latency_sum'),
+            latency_low=Min('latency_min'),
+            latency_high=Max('latency_max'),
+        )
+    for row in rows.order_by():
+        yield HealthRollup(
+            device_id=row['device_id'],
+            bucket=row['period'],
+            samples=row['samples'] if source is None else row['samples_total'],
+            reachable=row['reachable_count'],
+            port_open=row['port_open_count'],
+            latency_count=row['latency_count'] if source is None else row['latency_total_count'],
+            latency_sum=row['latency_total'] or 0.0,
+            latency_min=row['latency_low'],
+            latency_max=row['latency_high'],
+        )
+
+
+def _source_start(source):
+    if source is None:
+        return HealthSample.objects.aggregate(start=Min('sampled_at'))['start']
+    return HealthRollup.objects.filter(resolution=source).aggregate(start=Min('bucket'))['start']
+
+
+def rollup_health(now=None, batch_size=1000):
+    """
+    Bring every rollup level up to date with its source and return the
+    number of buckets written per resolution.
+
+    Only complete buckets are written. Each level restarts at its newest
+    existing bucket, which is recomputed from the source, so running this
+    after every sweep only reads the last few minutes of samples and
+    running it twice is harmless.
+    """
+    if now is None:
+        now = timezone.now()
+    written = {}
+    for resolution, kind, source in LEVELS:
+        end = floor_time(now, resolution)
+        start = HealthRollup.objects.filter(resolution=resolution).aggregate(start=Max('bucket'))['start']
+        if start is None:
+            start = _source_start(source)
+            if start is None:
+                written[resolution] = 0
+                continue
+            start = floor_time(start, resolution)
+
+        rollups = []
+        for rollup in _aggregate(source, kind, start, end):
+            rollup.resolution = resolution
+            rollups.append(rollup)
+        with transaction.atomic():
+            HealthRollup.objects.bulk_create(
+                rollups,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['device', 'resolution', 'bucket'],
+                update_fields=COUNTERS,
+            )
+        written[resolution] = len(rollups)
+    return written
+
+
+def prune_health(now=None, batch_size=10000):
+    """
+    Delete samples and rollups past their retention, in batches.
+
+    Returns the number of rows deleted per level (``None`` is raw samples).
+    """
+    if now is None:
+        now = timezone.now()
+    deleted = {}
+    for resolution, retention in get_retention().items():
+        cutoff = now - retention
+        if resolution is None:
+            expired = HealthSample.objects.filter(sampled_at__lt=cutoff)
+        else:
+            expired = HealthRollup.objects.filter(resolution=resolution, bucket__lt=cutoff)
+        deleted[resolution] = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted[resolution] += expired.model.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def choose_resolution(since, until, now=None):
+    """
+    Pick the finest resolution retained back to ``since`` that yields at
+    most ``MAX_POINTS`` buckets between ``since`` and ``until``.
+    """
+    if now is None:
+        now = timezone.now()
+    retention = get_retention()
+    span = (until - since).total_seconds()
+    for resolution, _, _ in LEVELS:
+        if since >= now - retention[resolution] and span / resolution <= MAX_POINTS:
+            return resolution
+    return HealthRollup.DAY
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _summarize(row):
+    samples = row['total_samples'] or 0
+    latency_count = row['total_latency_count'] or 0
+    return {
+        'samples': samples,
+        'uptime_percentage': round(row['total_port_open'] / samples * 100, 2) if samples else None,
+        'reachability_percentage': round(row['total_reachable'] / samples * 100, 2) if samples else None,
+        'avg_latency_ms': _milliseconds(row['total_latency_sum'] / latency_count) if latency_count else None,
+        'min_latency_ms': _milliseconds(row['total_latency_min']),
+        'max_latency_ms': _milliseconds(row['total_latency_max']),
+    }
+
+
+def query_health(since, until, resolution=None, device_id=None):
+    """
+    Return uptime and latency between ``since`` and ``until`` from rollups.
+
+    With ``device_id`` the history is for one device, otherwise for the
+    whole fleet. The result has a summary over the range and a series with
+    one point per bucket; both are aggregated by the database. A bucket
+    still in progress is not included until ``rollup_health`` closes it.
+    """
+    if resolution is None:
+        resolution = choose_resolution(since, until)
+    rollups = HealthRollup.objects.filter(
+        resolution=resolution,
+        bucket__gte=floor_time(since, resolution),
+        bucket__lt=until,
+    )
+    if device_id is not None:
+        rollups = rollups.filter(device_id=device_id)
+
+    totals = dict(
+        total_samples=Sum('samples'),
+        total_reachable=Sum('reachable'),
+        total_port_open=Sum('port_open'),
+        total_latency_count=Sum('latency_count'),
+        total_latency_sum=Sum('latency_sum'),
+        total_latency_min=Min('latency_min'),
+        total_latency_max=Max('latency_max'),
+    )
+    summary = rollups.aggregate(**totals)
+    series = rollups.order_by().values('bucket').annotate(**totals).order_by('bucket')
+    return {
+        'since': since,
+        'until': until,
+        'resolution': dict(HealthRollup.RESOLUTIONS)[resolution],
+        **_summarize(summary),
+        'series': [{'bucket': row['bucket'], **_summarize(row)} for row in series],
+    }
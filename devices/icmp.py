@@ -0,0 +1,192 @@
+"""
+Batched ICMP echo probing.
+
+``ping_many`` pings any number of IPv4 hosts from one process and one
+socket, fping style: requests go out back to back, replies are matched to
+their target by source address and sequence number, and each host gets its
+round-trip time. No process is started per host.
+
+Three socket modes are tried in order:
+
+* ``raw`` -- ``SOCK_RAW`` ICMP, needs root or ``CAP_NET_RAW``;
+* ``dgram`` -- unprivileged ``SOCK_DGRAM`` ICMP ("ping sockets"), allowed
+  on Linux for groups in ``net.ipv4.ping_group_range``; the kernel sets
+  the identifier and filters replies for us;
+* ``tcp`` -- a TCP connect to ``fallback_port``; a refused connection
+  still proves the host is up.
+
+IPv6 targets always use the TCP fallback.
+"""
+import asyncio
+import ipaddress
+import os
+import select
+import socket
+import struct
+import time
+from django.conf import settings
+
+ECHO_REPLY = 0
+ECHO_REQUEST = 8
+PAYLOAD = b'network-device-manager-probe'.ljust(32, b'\0')
+MODES = ('raw', 'dgram', 'tcp')
+
+_socket_types = {'raw': socket.SOCK_RAW, 'dgram': socket.SOCK_DGRAM}
+
+
+def get_icmp_mode():
+    return getattr(settings, 'DEVICE_POLL_ICMP_MODE', None)
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def echo_request(identifier, sequence, payload=PAYLOAD):
+    header = struct.pack('!BBHHH', ECHO_REQUEST, 0, 0, identifier, sequence)
+    return struct.pack('!BBHHH', ECHO_REQUEST, 0, checksum(header + payload), identifier, sequence) + payload
+
+
+def parse_echo_reply(packet, has_ip_header):
+    """
+    Return ``(identifier, sequence)`` of an echo reply, or None for anything else.
+    """
+    if has_ip_header:
+        if len(packet) < 20:
+            return None
+        packet = packet[(packet[0] & 0x0f) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _, _, identifier, sequence = struct.unpack('!BBHHH', packet[:8])
+    if icmp_type != ECHO_REPLY:
+        return None
+    return identifier, sequence
+
+
+def open_icmp_socket(mode=None):
+    """
+    Open a non-blocking ICMP socket, trying raw then datagram sockets.
+
+    Returns ``(mode, socket)``, or ``('tcp', None)`` when neither is allowed.
+    """
+    for candidate in ([mode] if mode else MODES):
+        if candidate == 'tcp':
+            return 'tcp', None
+        try:
+            sock = socket.socket(socket.AF_INET, _socket_types[candidate], socket.IPPROTO_ICMP)
+        except (PermissionError, OSError):
+            continue
+        sock.setblocking(False)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+        return candidate, sock
+    return 'tcp', None
+
+
+def _drain(sock, mode, identifier, pending, sent_at, rtts):
+    while True:
+        try:
+            packet, address = sock.recvfrom(2048)
+        except (BlockingIOError, InterruptedError):
+            return
+        received = time.perf_counter()
+        reply = parse_echo_reply(packet, has_ip_header=mode == 'raw')
+        if reply is None:
+            continue
+        reply_identifier, sequence = reply
+        host = address[0]
+        # Ping sockets rewrite the identifier and only deliver our replies.
+        if mode == 'raw' and reply_identifier != identifier:
+            continue
+        if pending.get(host) == sequence:
+            del pending[host]
+            rtts[host] = received - sent_at[host]
+
+
+def _ping_icmp(hosts, sock, mode, timeout, send_batch):
+    identifier = os.getpid() & 0xffff
+    pending = {}
+    sent_at = {}
+    rtts = {}
+    for index, host in enumerate(hosts):
+        sequence = index & 0xffff
+        packet = echo_request(identifier, sequence)
+        while True:
+            try:
+                sock.sendto(packet, (host, 0))
+                break
+            except (BlockingIOError, InterruptedError):
+                select.select([], [sock], [], timeout)
+            except OSError:
+                # e.g. ENETUNREACH: no route, so no reply will ever come.
+                sequence = None
+                break
+        if sequence is None:
+            continue
+        sent_at[host] = time.perf_counter()
+        pending[host] = sequence
+        # Pick up early replies so a large batch cannot overflow the
+        # receive buffer before we start reading.
+        if index % send_batch == send_batch - 1:
+            _drain(sock, mode, identifier, pending, sent_at, rtts)
+
+    deadline = time.perf_counter() + timeout
+    while pending:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([sock], [], [], remaining)
+        if readable:
+            _drain(sock, mode, identifier, pending, sent_at, rtts)
+    return rtts
+
+
+async def _ping_tcp(hosts, port, timeout, concurrency):
+    # Imported here: the poller imports this module.
+    from .poller import probe_tcp
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(host):
+        async with semaphore:
+            reachable, _, latency = await probe_tcp(host, port, timeout)
+        return host, latency if reachable else None
+
+    return dict(await asyncio.gather(*(probe(host) for host in hosts)))
+
+
+def ping_many(addresses, timeout=1.0, mode=None, fallback_port=22, tcp_fallback=True,
+              send_batch=256, concurrency=200):
+    """
+    Ping ``addresses`` in one batch and return ``{address: rtt}``.
+
+    ``rtt`` is in seconds, or None when no reply came within ``timeout``
+    of the last request being sent. ``mode`` forces ``raw``, ``dgram`` or
+    ``tcp``; by default the best allowed mode is used. With
+    ``tcp_fallback`` false, hosts that cannot be pinged with ICMP are
+    reported as None instead of being probed over TCP.
+    """
+    hosts = list(dict.fromkeys(str(address) for address in addresses))
+    results = dict.fromkeys(hosts)
+    ipv4 = [host for host in hosts if ipaddress.ip_address(host).version == 4]
+
+    mode, sock = open_icmp_socket(mode or get_icmp_mode())
+    if sock is None:
+        tcp_hosts = hosts
+    else:
+        tcp_hosts = [host for host in hosts if ipaddress.ip_address(host).version != 4]
+        try:
+            if ipv4:
+                results.update(_ping_icmp(ipv4, sock, mode, timeout, send_batch))
+        finally:
+            sock.close()
+
+    if tcp_hosts and tcp_fallback:
+        results.update(asyncio.run(_ping_tcp(tcp_hosts, fallback_port, timeout, concurrency)))
+    return results
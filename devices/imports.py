@@ -0,0 +1,179 @@
+"""
+Bulk device import: NDJSON/CSV in, upsert by ``name``, per-row error report.
+
+Rows are validated in batches with one reusable serializer, so there is no
+per-row uniqueness query. Existing names are looked up once per batch,
+and each batch is written with ``bulk_create(update_conflicts=True)``.
+"""
+import codecs
+import csv
+import json
+from collections import defaultdict
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.parsers import BaseParser
+from .ip_index import invalidate_ip_index
+from .models import Device
+from .stats import invalidate_device_statistics
+
+IMPORT_FIELDS = [
+    'name', 'device_type', 'ip_address', 'mac_address', 'location', 'vendor',
+    'model', 'os_version', 'status', 'ssh_port', 'ssh_username', 'ssh_password',
+    'description',
+]
+
+
+class DeviceImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Device
+        fields = IMPORT_FIELDS
+        extra_kwargs = {
+            # Names are upsert keys here, not a uniqueness error.
+            'name': {'validators': []},
+            'ssh_password': {'write_only': True},
+        }
+
+
+def parse_ndjson(lines):
+    """
+    Yield ``(line_number, row, error)`` for each non-blank NDJSON line.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+
+
+def parse_csv(lines):
+    """
+    Yield ``(line_number, row, error)`` for each CSV record after the header.
+
+    Empty cells are left out of the row, so they never overwrite a value.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+
+
+def parse_objects(objects):
+    for number, row in enumerate(objects, 1):
+        yield number, row, None
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        # Lazy: rows are read from the request body as they are imported.
+        return parse_ndjson(codecs.getreader('utf-8')(stream))
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return parse_csv(codecs.getreader('utf-8-sig')(stream))
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_devices(rows, user, batch_size=1000, dry_run=False):
+    """
+    Upsert ``(line_number, row, error)`` tuples as devices and return a report.
+
+    Rows for new names must be complete; rows for existing names may carry
+    only the fields to change, and only those fields are updated. New
+    devices are created by ``user``. A name repeated in the same import is
+    an error on every row after the first.
+    """
+    full = DeviceImportSerializer()
+    partial = DeviceImportSerializer(partial=True)
+    name_field = full.fields['name']
+    report = {'total': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    seen = set()
+
+    def fail(line, name, errors):
+        report['failed'] += 1
+        report['errors'].append({'row': line, 'name': name, 'errors': errors})
+
+    for batch in _batches(rows, batch_size):
+        # Names are normalized (trimmed, type-checked) the way validation
+        # will, so the existing-row lookup matches the name being upserted.
+        prepared = []
+        for line, row, error in batch:
+            name = None
+            if error is None and isinstance(row, dict) and row.get('name') is not None:
+                try:
+                    name = name_field.run_validation(row['name'])
+                except serializers.ValidationError as e:
+                    error = {'name': e.detail}
+            prepared.append((line, row, error, name))
+
+        # Current values of existing devices fill the columns a partial row
+        # leaves out: the INSERT half of the upsert must satisfy NOT NULL
+        # even though only the row's own fields are updated.
+        existing = {
+            values['name']: values
+            for values in Device.objects.filter(name__in=[name for *_, name in prepared if name is not None])
+            .values(*IMPORT_FIELDS)
+        }
+        # Rows are grouped by the fields they set, since one upsert
+        # statement updates the same columns on every conflicting row.
+        groups = defaultdict(list)
+        for line, row, error, name in prepared:
+            report['total'] += 1
+            if isinstance(error, dict):
+                fail(line, None, error)
+                continue
+            if error is not None:
+                fail(line, None, {'non_field_errors': [error]})
+                continue
+            if not isinstance(row, dict):
+                fail(line, None, {'non_field_errors': ['Expected an object']})
+                continue
+            exists = name in existing
+            try:
+                validated = (partial if exists else full).run_validation(row)
+            except serializers.ValidationError as e:
+                fail(line, name, e.detail)
+                continue
+            if 'name' not in validated:
+                fail(line, name, {'name': ['This field is required.']})
+                continue
+            if validated['name'] in seen:
+                fail(line, name, {'name': ['Duplicate name in this import.']})
+                continue
+            seen.add(validated['name'])
+            report['updated' if exists else 'created'] += 1
+            values = {**existing[name], **validated} if exists else validated
+            groups[frozenset(validated) - {'name'}].append(Device(created_by=user, **values))
+
+        if dry_run:
+            continue
+        with transaction.atomic():
+            for fields, devices in groups.items():
+                Device.objects.bulk_create(
+                    devices,
+                    update_conflicts=True,
+                    unique_fields=['name'],
+                    update_fields=sorted(fields) + ['updated_at'],
+                )
+
+    # bulk_create() bypasses post_save, so drop cached statistics and the
+    # address index here.
+    if not dry_run and (report['created'] or report['updated']):
+        invalidate_device_statistics()
+        invalidate_ip_index()
+    return report
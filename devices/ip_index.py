@@ -0,0 +1,397 @@
+"""
+In-process prefix-trie index over ``Device.ip_address``.
+
+Addresses are kept in one path-compressed binary trie per address family,
+keyed by their bits, so "who owns this IP" (longest-prefix match), "which
+devices are in 10.20.0.0/16" (containment) and overlap queries walk at
+most one node per prefix bit instead of scanning the device table.
+
+Each process builds its own index on first use (and again after a fork).
+``post_save``/``post_delete`` on ``Device`` update it in place; every
+change, including bulk writes that call ``invalidate_ip_index``, also
+bumps a generation counter in the cache, and an index that sees a
+generation it did not produce rebuilds itself from the table. With a
+shared cache (Redis) that keeps every worker in step.
+
+With a per-process cache (the default) the counter cannot see other
+workers' writes, so the index is checked against the table instead: one
+aggregate of the row count and the newest ``updated_at`` before each
+query, and a rebuild when either moved.
+"""
+import ipaddress
+import os
+import threading
+from collections import defaultdict
+from django.core.cache import cache
+from django.db.models import Count, Max
+from accounts.user_cache import cache_is_shared
+from .models import Device
+
+IP_INDEX_GENERATION_KEY = 'devices:ip_index:generation'
+
+
+class _Node:
+    __slots__ = ('key', 'length', 'zero', 'one', 'values')
+
+    def __init__(self, key, length, values=None):
+        self.key = key
+        self.length = length
+        self.zero = None
+        self.one = None
+        self.values = values
+
+
+class PrefixTrie:
+    """
+    A path-compressed binary trie of ``(key, length)`` prefixes.
+
+    ``key`` is the prefix as a ``width``-bit integer with the host bits
+    cleared, as in ``int(network.network_address)``. Every stored prefix
+    carries a tuple of values.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+
+    @classmethod
+    def from_sorted(cls, width, items):
+        """
+        Build a trie of full-width keys from ``(key, values)`` pairs sorted
+        by key, without duplicates, in one pass.
+
+        The trie's shape only depends on the common prefix of neighbouring
+        keys, so the right-hand path is kept on a stack and each new key
+        hangs off the deepest node that shares its prefix.
+        """
+        trie = cls(width)
+        root = trie.root
+        stack = [root]
+        previous = None
+        for key, values in items:
+            leaf = _Node(key, width, values)
+            trie.size += 1
+            if previous is None:
+                trie._set_child(root, trie._bit(key, 0), leaf)
+                stack.append(leaf)
+                previous = key
+                continue
+            common = width - (previous ^ key).bit_length()
+            last = None
+            while stack[-1].length > common:
+                last = stack.pop()
+            top = stack[-1]
+            if top.length == common:
+                # Sorted keys: the one-side of this branch is still free.
+                top.one = leaf
+            else:
+                branch = _Node(trie._mask(key, common), common)
+                branch.zero = last
+                branch.one = leaf
+                trie._set_child(top, trie._bit(key, top.length), branch)
+                stack.append(branch)
+            stack.append(leaf)
+            previous = key
+        return trie
+
+    def _mask(self, key, length):
+        return key >> (self.width - length) << (self.width - length) if length else 0
+
+    def _bit(self, key, index):
+        return key >> (self.width - 1 - index) & 1
+
+    def _common(self, a, b, limit):
+        differing = self.width - (a ^ b).bit_length()
+        return min(differing, limit)
+
+    def _child(self, node, bit):
+        return node.one if bit else node.zero
+
+    def _set_child(self, node, bit, child):
+        if bit:
+            node.one = child
+        else:
+            node.zero = child
+
+    def insert(self, key, length, value):
+        key = self._mask(key, length)
+        node = self.root
+        while True:
+            if node.length == length:
+                if node.values is None:
+                    self.size += 1
+                    node.values = (value,)
+                elif value not in node.values:
+                    node.values += (value,)
+                return
+            bit = self._bit(key, node.length)
+            child = self._child(node, bit)
+            if child is None:
+                self._set_child(node, bit, _Node(key, length, (value,)))
+                self.size += 1
+                return
+            common = self._common(child.key, key, min(child.length, length))
+            if common == child.length:
+                node = child
+                continue
+            # Split: a new node for the shared prefix takes the child's place.
+            branch = _Node(self._mask(key, common), common)
+            self._set_child(node, bit, branch)
+            self._set_child(branch, self._bit(child.key, common), child)
+            if common == length:
+                branch.values = (value,)
+            else:
+                self._set_child(branch, self._bit(key, common), _Node(key, length, (value,)))
+            self.size += 1
+            return
+
+    def remove(self, key, length, value):
+        key = self._mask(key, length)
+        path = [self.root]
+        node = self.root
+        while node.length < length:
+            node = self._child(node, self._bit(key, node.length))
+            if node is None or node.length > length or self._mask(key, node.length) != node.key:
+                return False
+            path.append(node)
+        if node.length != length or node.key != key or not node.values or value not in node.values:
+            return False
+        node.values = tuple(v for v in node.values if v != value) or None
+        if node.values is None:
+            self.size -= 1
+            self._prune(path)
+        return True
+
+    def _prune(self, path):
+        # Drop or splice out value-less nodes with fewer than two children.
+        while len(path) > 1:
+            node = path.pop()
+            parent = path[-1]
+            if node.values is not None or (node.zero is not None and node.one is not None):
+                return
+            bit = self._bit(node.key, parent.length)
+            self._set_child(parent, bit, node.zero or node.one)
+
+    def longest_match(self, key, length=None):
+        """
+        Return the longest stored ``(key, length, values)`` covering the prefix, or None.
+        """
+        if length is None:
+            length = self.width
+        key = self._mask(key, length)
+        best = None
+        node = self.root
+        while node is not None and node.length <= length and self._mask(key, node.length) == node.key:
+            if node.values is not None:
+                best = node
+            if node.length == length:
+                break
+            node = self._child(node, self._bit(key, node.length))
+        return None if best is None else (best.key, best.length, best.values)
+
+    def covering(self, key, length):
+        """
+        Yield stored prefixes that contain ``(key, length)``, shortest first.
+        """
+        key = self._mask(key, length)
+        node = self.root
+        while node is not None and node.length <= length and self._mask(key, node.length) == node.key:
+            if node.values is not None:
+                yield node.key, node.length, node.values
+            if node.length == length:
+                return
+            node = self._child(node, self._bit(key, node.length))
+
+    def covered(self, key, length):
+        """
+        Yield stored prefixes inside ``(key, length)``, including it, in key order.
+        """
+        key = self._mask(key, length)
+        node = self.root
+        while node is not None and node.length < length:
+            if self._mask(key, node.length) != node.key:
+                return
+            node = self._child(node, self._bit(key, node.length))
+        if node is None or self._mask(node.key, length) != key:
+            return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.values is not None:
+                yield node.key, node.length, node.values
+            if node.one is not None:
+                stack.append(node.one)
+            if node.zero is not None:
+                stack.append(node.zero)
+
+
+def parse_address(value):
+    """
+    Parse a stored address; None for blank or malformed values.
+    """
+    try:
+        return ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _network(key, length, version):
+    network_class = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+    return network_class((key, length))
+
+
+class IPIndex:
+    """
+    Device ids by address, in one ``PrefixTrie`` per address family.
+    """
+
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        # Device id to address as an integer, per address family.
+        self.addresses = {4: {}, 6: {}}
+        self.generation = None
+        self.table_version = None
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._pid = None
+
+    def rebuild(self):
+        """
+        Load every device address from the table and swap the new tries in.
+        """
+        # Read first: a change committed during the load bumps it again.
+        generation = cache.get(IP_INDEX_GENERATION_KEY)
+        table_version = None if cache_is_shared() else _table_version()
+        addresses = {4: {}, 6: {}}
+        for device_id, value in Device.objects.values_list('id', 'ip_address').iterator(chunk_size=5000):
+            address = parse_address(value)
+            if address is not None:
+                addresses[address.version][device_id] = int(address)
+        tries = {}
+        for version, width in ((4, 32), (6, 128)):
+            by_key = defaultdict(list)
+            for device_id, key in addresses[version].items():
+                by_key[key].append(device_id)
+            tries[version] = PrefixTrie.from_sorted(
+                width, ((key, tuple(by_key[key])) for key in sorted(by_key))
+            )
+        with self._lock:
+            self.tries = tries
+            self.addresses = addresses
+            self.generation = generation
+            self.table_version = table_version
+            self._pid = os.getpid()
+        return len(addresses[4]) + len(addresses[6])
+
+    def is_current(self):
+        if self._pid != os.getpid():
+            return False
+        if not cache_is_shared():
+            # Our own writes move the version too and cost a rebuild; the
+            # counter cannot tell them apart from other workers' here.
+            return _table_version() == self.table_version
+        return cache.get(IP_INDEX_GENERATION_KEY) == self.generation
+
+    def ensure_current(self):
+        if self.is_current():
+            return
+        # One thread rebuilds; the others wait for it instead of repeating it.
+        with self._build_lock:
+            if not self.is_current():
+                self.rebuild()
+
+    def apply(self, device_id, value):
+        """
+        Record a device's new address (None when it was deleted).
+        """
+        generation = _bump_generation()
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for version, trie in self.tries.items():
+                previous = self.addresses[version].pop(device_id, None)
+                if previous is not None:
+                    trie.remove(previous, trie.width, device_id)
+            address = parse_address(value) if value is not None else None
+            if address is not None:
+                self.tries[address.version].insert(int(address), address.max_prefixlen, device_id)
+                self.addresses[address.version][device_id] = int(address)
+            # Only our own bump moved the counter: nothing to reload.
+            if generation is not None and self.generation is not None and generation == self.generation + 1:
+                self.generation = generation
+
+    def lookup(self, address):
+        """
+        Longest-prefix match for one address: ``(network, device_ids)`` or None.
+        """
+        self.ensure_current()
+        with self._lock:
+            match = self.tries[address.version].longest_match(int(address))
+        if match is None:
+            return None
+        key, length, values = match
+        return _network(key, length, address.version), list(values)
+
+    def _query(self, network, method):
+        self.ensure_current()
+        with self._lock:
+            trie_method = getattr(self.tries[network.version], method)
+            return [
+                (_network(key, length, network.version), list(values))
+                for key, length, values in trie_method(int(network.network_address), network.prefixlen)
+            ]
+
+    def contained(self, network):
+        """
+        Entries inside ``network``, in address order.
+        """
+        return self._query(network, 'covered')
+
+    def containing(self, network):
+        """
+        Entries that contain ``network``, widest first.
+        """
+        return self._query(network, 'covering')
+
+    def overlapping(self, network):
+        """
+        Entries that contain or lie inside ``network``.
+        """
+        containing = self.containing(network)
+        # The network itself is in both lists; keep it once.
+        return [entry for entry in containing if entry[0] != network] + self.contained(network)
+
+
+def _table_version():
+    # Deletions lower the count; saves, bulk imports included, move updated_at.
+    version = Device.objects.aggregate(count=Count('id'), changed=Max('updated_at'))
+    return version['count'], version['changed']
+
+
+def _bump_generation():
+    # add() is a no-op when the counter exists, so incr() never sees a miss.
+    cache.add(IP_INDEX_GENERATION_KEY, 0, timeout=None)
+    try:
+        return cache.incr(IP_INDEX_GENERATION_KEY)
+    except ValueError:
+        return None
+
+
+def invalidate_ip_index():
+    """
+    Make every process rebuild its index; for writes that bypass signals.
+    """
+    _bump_generation()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ip_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IPIndex()
+        return _index
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .events import command_events, record_events
+from .models import DeviceCommand
+from .utils import execute_ssh_command
+
+
+class JobBackend:
+    """
+    Base class for command queue backends.
+
+    A backend only needs to run ``func(*args)`` somewhere other than the
+    request thread; a broker-backed implementation would serialize the
+    function's dotted path and arguments instead of calling it in-process.
+    """
+
+    def submit(self, func, *args):
+        raise NotImplementedError
+
+
+class ImmediateBackend(JobBackend):
+    """
+    Run jobs synchronously in the calling thread. Useful for debugging.
+    """
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolBackend(JobBackend):
+    """
+    Run jobs on an in-process thread pool.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = getattr(settings, 'COMMAND_QUEUE_WORKERS', 16)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='command-job')
+
+    def submit(self, func, *args):
+        return self.executor.submit(self._run, func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        close_old_connections()
+        try:
+            func(*args)
+        finally:
+            connection.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_job_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_path = getattr(settings, 'COMMAND_QUEUE_BACKEND', 'devices.jobs.ThreadPoolBackend')
+            _backend = import_string(backend_path)()
+        return _backend
+
+
+def execute_command_job(command_id):
+    """
+    Run a pending ``DeviceCommand`` and record its progress.
+
+    The ``pending`` -> ``running`` transition is a conditional UPDATE, so a
+    command delivered twice by a backend is only executed once.
+    """
+    claimed = DeviceCommand.objects.filter(id=command_id, status='pending').update(status='running')
+    if not claimed:
+        return
+
+    command_obj = DeviceCommand.objects.select_related('device').get(id=command_id)
+    try:
+        success, output = execute_ssh_command(command_obj.device, command_obj.command)
+    except Exception as e:
+        success, output = False, str(e)
+
+    command_obj.status = 'completed' if success else 'failed'
+    command_obj.completed_at = timezone.now()
+    DeviceCommand.objects.filter(id=command_id).update(
+        status=command_obj.status,
+        output=output if success else '',
+        error_message='' if success else output,
+        completed_at=command_obj.completed_at,
+    )
+    record_events(command_events([command_obj]))
+
+
+def enqueue_command(command_obj):
+    """
+    Queue ``command_obj`` for background execution once the row is committed.
+    """
+    transaction.on_commit(lambda: get_job_backend().submit(execute_command_job, command_obj.id))
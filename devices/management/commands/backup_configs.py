@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from devices.backups import create_backup_run, run_backup
+from devices.models import BackupRun, Device
+
+class Command(BaseCommand):
+    help = 'Back up the running configuration of many devices concurrently'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resume', type=int, metavar='RUN_ID', default=None,
+                            help='Resume a previous run, retrying only devices without a backup')
+        parser.add_argument('--online-only', action='store_true',
+                            help='Only back up devices currently marked online')
+        parser.add_argument('--vendor', default=None,
+                            help='Only back up devices from this vendor')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Maximum number of concurrent SSH sessions')
+        parser.add_argument('--timeout', type=int, default=None,
+                            help='Per-device timeout in seconds')
+        parser.add_argument('--stragglers', type=int, default=10,
+                            help='Number of slowest devices to report')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                run = BackupRun.objects.get(id=options['resume'])
+            except BackupRun.DoesNotExist:
+                raise CommandError(f"Backup run {options['resume']} does not exist")
+            self.stdout.write(f'Resuming backup run {run.id}...')
+        else:
+            queryset = Device.objects.all()
+            if options['online_only']:
+                queryset = queryset.filter(status='online')
+            if options['vendor']:
+                queryset = queryset.filter(vendor__iexact=options['vendor'])
+            run = create_backup_run(queryset)
+            self.stdout.write(f'Starting backup run {run.id} for {run.total} devices...')
+
+        report = run_backup(
+            run,
+            max_workers=options['workers'],
+            timeout=options['timeout'],
+            stragglers=options['stragglers'],
+        )
+
+        self.stdout.write(
+            f"Backed up {report['attempted']} devices in {report['duration']}s "
+            f"({report['throughput']} devices/s, {report['skipped']} already done)"
+        )
+        for straggler in report['stragglers']:
+            self.stdout.write(f"  {straggler['device']}: {straggler['seconds']}s")
+        if report['timed_out']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(report['timed_out'])} devices hit the {report['timeout']}s per-device timeout"
+            ))
+        for device_id, error in run.errors.items():
+            self.stdout.write(self.style.WARNING(f'  device {device_id} failed: {error}'))
+
+        if run.errors:
+            self.stdout.write(self.style.ERROR(
+                f'{run.failed} of {run.total} devices failed; rerun with --resume {run.id}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Backup run {run.id} completed'))
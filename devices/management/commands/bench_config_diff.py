@@ -0,0 +1,66 @@
+import difflib
+import random
+import time
+from django.core.management.base import BaseCommand
+from devices.config_diff import structured_diff, unified_diff
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark config diffing on synthetic large firewall configs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100000,
+                            help='Approximate number of lines per config')
+        parser.add_argument('--changes', type=int, default=50,
+                            help='Number of edited lines in the second config')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Timed runs per diff format')
+        parser.add_argument('--baseline', action='store_true',
+                            help='Also time difflib.unified_diff for comparison')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        old = self.generate(options['lines'])
+        new = list(old)
+        for _ in range(options['changes']):
+            index = rng.randrange(len(new))
+            if rng.random() < 0.5:
+                new[index] += ' log'
+            else:
+                new.insert(index, f'access-list 199 deny ip host 192.0.2.{rng.randrange(256)} any')
+        old_text, new_text = '\n'.join(old), '\n'.join(new)
+        self.stdout.write(f'{len(old)} -> {len(new)} lines, {options["changes"]} edits')
+
+        self.time('unified', lambda: unified_diff(old_text, new_text), options['repeat'])
+        self.time('structured', lambda: structured_diff(old_text, new_text), options['repeat'])
+        if options['baseline']:
+            self.time('difflib', lambda: list(difflib.unified_diff(old, new, lineterm='')), options['repeat'])
+
+    def time(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(f'{label:>10}: best {min(timings) * 1000:.1f} ms, mean {sum(timings) / len(timings) * 1000:.1f} ms')
+
+    @staticmethod
+    def generate(line_count):
+        lines = ['hostname FW-BENCH', '!']
+        interface = 0
+        while len(lines) < line_count // 5:
+            lines += [
+                f'interface GigabitEthernet0/{interface}',
+                f' description uplink {interface}',
+                f' ip address 10.{interface >> 8 & 255}.{interface & 255}.1 255.255.255.0',
+                ' no shutdown',
+                '!',
+            ]
+            interface += 1
+        rule = 0
+        while len(lines) < line_count:
+            lines.append(
+                f'access-list 101 permit tcp 10.{rule >> 16 & 255}.{rule >> 8 & 255}.0 0.0.0.255 '
+                f'host 172.16.{rule & 255}.{rule % 250 + 1} eq {1024 + rule % 4000}'
+            )
+            rule += 1
+        return lines
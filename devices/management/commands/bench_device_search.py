@@ -0,0 +1,84 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import QueryDict
+from devices.filters import DeviceFilter
+from devices.models import Device
+
+User = get_user_model()
+
+QUERIES = [
+    'search=bench-4242',
+    'search=ju',
+    'search=rack 17',
+    'search=10.1.',
+    'vendor=Arista',
+    'status=online&device_type=router',
+    'subnet=10.1.128.0/20',
+    'ip_address=10.0.16.16',
+]
+
+class Command(BaseCommand):
+    help = 'Benchmark device list filters and search latency on a large fleet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=100000,
+                            help='Fleet size to benchmark')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per query')
+        parser.add_argument('--explain', action='store_true',
+                            help='Print the query plan of each filter')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to benchmark on; its devices are replaced')
+        parser.add_argument('--i-know', action='store_true',
+                            help='Allow running on the default database')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if database == DEFAULT_DB_ALIAS and not options['i_know']:
+            # Every device is deleted inside the (rolled back) transaction,
+            # which still locks the production table while it runs.
+            raise CommandError(
+                'This benchmark replaces every device; pass --database with a scratch '
+                'database alias, or --i-know to run it on the default database'
+            )
+        with transaction.atomic(using=database):
+            self.populate(options['devices'], database)
+            with connections[database].cursor() as cursor:
+                cursor.execute('ANALYZE devices_device')
+            for query in QUERIES:
+                queryset = DeviceFilter(QueryDict(query), queryset=Device.objects.using(database)).qs
+                # One page of the list view, as the API would fetch it.
+                page = queryset[:20]
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    matched = len(list(page.values_list('id', flat=True)))
+                elapsed = (time.perf_counter() - started) / options['repeat']
+                self.stdout.write(f'{query:<36} {matched:>3} rows  {elapsed * 1000:8.2f} ms')
+                if options['explain']:
+                    self.stdout.write(page.explain())
+            transaction.set_rollback(True, using=database)
+
+    def populate(self, size, database):
+        Device.objects.using(database).all().delete()
+        user = User.objects.db_manager(database).create_user(username=f'bench-search-{size}', password=None)
+        device_types = [choice[0] for choice in Device.DEVICE_TYPES]
+        statuses = [choice[0] for choice in Device.STATUS_CHOICES]
+        vendors = ['Cisco', 'Juniper', 'HP', 'Fortinet', 'Arista']
+        Device.objects.using(database).bulk_create(
+            (
+                Device(
+                    name=f'bench-{i}',
+                    device_type=device_types[i % len(device_types)],
+                    ip_address=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+                    location=f'dc{i % 7} rack {i % 40}',
+                    vendor=vendors[i % len(vendors)],
+                    model=f'model-{i % 50}',
+                    status=statuses[i % len(statuses)],
+                    created_by=user,
+                )
+                for i in range(size)
+            ),
+            batch_size=1000,
+        )
@@ -0,0 +1,53 @@
+import ipaddress
+import shutil
+import subprocess
+import time
+from django.core.management.base import BaseCommand
+from devices.icmp import MODES, open_icmp_socket, ping_many
+
+class Command(BaseCommand):
+    help = 'Benchmark batched ICMP probing against 127.0.0.0/8 in every available mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=10000,
+                            help='Number of loopback addresses to ping')
+        parser.add_argument('--timeout', type=float, default=1.0,
+                            help='Seconds to wait for replies after the last request')
+        parser.add_argument('--subprocess-sample', type=int, default=100,
+                            help='Hosts pinged with one /bin/ping per host, for comparison')
+
+    def handle(self, *args, **options):
+        count = options['hosts']
+        # 127.0.0.0/8 always answers locally, so every host must reply.
+        first = ipaddress.ip_address('127.0.0.1')
+        hosts = [str(first + i) for i in range(count)]
+
+        for mode in MODES:
+            available, sock = open_icmp_socket(mode)
+            if sock is not None:
+                sock.close()
+            if available != mode:
+                self.stdout.write(f'{mode:>6}: not permitted here, skipped')
+                continue
+            started = time.perf_counter()
+            rtts = ping_many(hosts, timeout=options['timeout'], mode=mode, fallback_port=22)
+            elapsed = time.perf_counter() - started
+            answered = sorted(rtt for rtt in rtts.values() if rtt is not None)
+            median = answered[len(answered) // 2] * 1000 if answered else 0
+            self.stdout.write(
+                f'{mode:>6}: {len(answered)}/{len(hosts)} answered in {elapsed:.3f}s '
+                f'({len(hosts) / elapsed:.0f} hosts/s, median rtt {median:.3f} ms)'
+            )
+
+        ping = shutil.which('ping')
+        sample = hosts[:options['subprocess_sample']]
+        if ping is None or not sample:
+            self.stdout.write('  ping: /bin/ping not found, subprocess baseline skipped')
+            return
+        started = time.perf_counter()
+        for host in sample:
+            subprocess.run([ping, '-c', '1', '-W', '1', host], capture_output=True)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  ping: {len(sample)} hosts one process each in {elapsed:.3f}s ({len(sample) / elapsed:.0f} hosts/s)'
+        )
@@ -0,0 +1,87 @@
+import ipaddress
+import random
+import resource
+import time
+from django.core.management.base import BaseCommand
+from devices.ip_index import PrefixTrie
+
+class Command(BaseCommand):
+    help = 'Benchmark the device address trie against a linear scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addresses', type=int, default=1000000,
+                            help='Number of random IPv4 addresses to index')
+        parser.add_argument('--queries', type=int, default=10000,
+                            help='Timed lookups per query type')
+        parser.add_argument('--scan-sample', type=int, default=20,
+                            help='Queries answered by a linear scan, for comparison')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Dense enough in 10.0.0.0/8 that /16 and /24 queries find devices.
+        addresses = rng.sample(range(0x0a000000, 0x0b000000), options['addresses'])
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        # As IPIndex.rebuild() does it: sort once, then build in one pass.
+        trie = PrefixTrie.from_sorted(32, ((address, (address,)) for address in sorted(addresses)))
+        build = time.perf_counter() - started
+        # ru_maxrss is in KiB on Linux.
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+        self.stdout.write(
+            f'build: {trie.size} addresses in {build:.2f}s, peak RSS +{memory / 1024:.0f} MiB'
+        )
+
+        # Signal-driven updates: one device moves to a new address.
+        moves = list(zip(
+            rng.sample(addresses, options['queries']),
+            rng.sample(range(0x0b000000, 0x0c000000), options['queries']),
+        ))
+        started = time.perf_counter()
+        for old, new in moves:
+            trie.remove(old, 32, old)
+            trie.insert(new, 32, old)
+        self.report('move device', len(moves), time.perf_counter() - started)
+        for old, new in moves:
+            trie.remove(new, 32, old)
+            trie.insert(old, 32, old)
+
+        probes = [rng.choice(addresses) if i % 2 else rng.randrange(0x0a000000, 0x0b000000)
+                  for i in range(options['queries'])]
+        networks = {
+            '/24': [ipaddress.ip_network((address, 24), strict=False) for address in probes],
+            '/16': [ipaddress.ip_network((address, 16), strict=False) for address in probes[:100]],
+        }
+
+        started = time.perf_counter()
+        for address in probes:
+            trie.longest_match(address)
+        self.report('longest match', len(probes), time.perf_counter() - started)
+        for label, queries in networks.items():
+            started = time.perf_counter()
+            found = 0
+            for network in queries:
+                found += sum(1 for _ in trie.covered(int(network.network_address), network.prefixlen))
+            self.report(f'contained in {label}', len(queries), time.perf_counter() - started,
+                        f'{found / len(queries):.0f} devices each')
+        started = time.perf_counter()
+        for network in networks['/24']:
+            list(trie.covering(int(network.network_address), network.prefixlen))
+        self.report('containing /24', len(networks['/24']), time.perf_counter() - started)
+
+        sample = networks['/24'][:options['scan_sample']]
+        started = time.perf_counter()
+        for network in sample:
+            low = int(network.network_address)
+            high = int(network.broadcast_address)
+            expected = sorted(address for address in addresses if low <= address <= high)
+            got = sorted(key for key, _, _ in trie.covered(low, network.prefixlen))
+            if got != expected:
+                self.stdout.write(self.style.ERROR(f'Mismatch for {network}'))
+                return
+        self.report('linear scan /24', len(sample), time.perf_counter() - started)
+        self.stdout.write(self.style.SUCCESS('Trie results match the linear scan'))
+
+    def report(self, label, count, elapsed, extra=''):
+        self.stdout.write(f'{label:>16}: {elapsed / count * 1e6:10.1f} us/query {extra}')
@@ -0,0 +1,76 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from devices.models import Device
+from devices.stats import compute_device_statistics
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Benchmark device statistics query count and latency across fleet sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000, 100000],
+                            help='Fleet sizes to benchmark')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per fleet size')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to benchmark on; its devices are replaced')
+        parser.add_argument('--i-know', action='store_true',
+                            help='Allow running on the default database')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if database == DEFAULT_DB_ALIAS and not options['i_know']:
+            # Every device is deleted inside the (rolled back) transaction,
+            # which still locks the production table while it runs.
+            raise CommandError(
+                'This benchmark replaces every device; pass --database with a scratch '
+                'database alias, or --i-know to run it on the default database'
+            )
+        query_counts = set()
+        for size in options['sizes']:
+            with transaction.atomic(using=database):
+                self.populate(size, database)
+                with CaptureQueriesContext(connections[database]) as queries:
+                    compute_device_statistics(using=database)
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    compute_device_statistics(using=database)
+                elapsed = (time.perf_counter() - started) / options['repeat']
+                transaction.set_rollback(True, using=database)
+
+            query_counts.add(len(queries.captured_queries))
+            self.stdout.write(
+                f'{size:>8} devices: {len(queries.captured_queries)} queries, {elapsed * 1000:.2f} ms'
+            )
+
+        if len(query_counts) == 1:
+            self.stdout.write(self.style.SUCCESS('Query count is constant across fleet sizes'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Query count varies with fleet size: {sorted(query_counts)}'))
+
+    def populate(self, size, database):
+        Device.objects.using(database).all().delete()
+        user = User.objects.db_manager(database).create_user(username=f'bench-statistics-{size}', password=None)
+        device_types = [choice[0] for choice in Device.DEVICE_TYPES]
+        statuses = [choice[0] for choice in Device.STATUS_CHOICES]
+        vendors = ['Cisco', 'Juniper', 'HP', 'Fortinet', 'Arista']
+        Device.objects.using(database).bulk_create(
+            (
+                Device(
+                    name=f'bench-{i}',
+                    device_type=device_types[i % len(device_types)],
+                    ip_address=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+                    location='bench',
+                    vendor=vendors[i % len(vendors)],
+                    model='bench',
+                    status=statuses[i % len(statuses)],
+                    created_by=user,
+                )
+                for i in range(size)
+            ),
+            batch_size=1000,
+        )
@@ -4,9 +4,23 @@ from devices.utils import update_device_status
 class Command(BaseCommand):
     help = 'Check and update status of all network devices'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Maximum number of probes in flight')
+        parser.add_argument('--timeout', type=float, default=None,
+                            help='Per-device probe timeout in seconds')
+
     def handle(self, *args, **options):
         self.stdout.write('Checking device status...')
-        update_device_status()
+        report = update_device_status(
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+        )
+        self.stdout.write(
+            f"Probed {report['total']} devices in {report['probe_duration']}s "
+            f"({report['online']} online, {report['offline']} offline, "
+            f"{report['unreachable']} unreachable, {report['changed']} changed)"
+        )
         self.stdout.write(
-            self.style.SUCCESS('Successfully updated device statuses')
+            self.style.SUCCESS(f"Successfully updated device statuses in {report['duration']}s")
         )
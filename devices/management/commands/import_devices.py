@@ -0,0 +1,50 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from devices.imports import import_devices, parse_csv, parse_ndjson
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Upsert devices by name from an NDJSON or CSV inventory file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Inventory file (.ndjson, .jsonl or .csv)')
+        parser.add_argument('--user', required=True,
+                            help='Username recorded as the creator of new devices')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default=None,
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows validated and written per batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and report without writing')
+        parser.add_argument('--errors', default=None,
+                            help='Write the per-row error report to this NDJSON file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        file_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'ndjson')
+        parse = parse_csv if file_format == 'csv' else parse_ndjson
+        with open(options['path'], encoding='utf-8-sig', newline='') as f:
+            report = import_devices(parse(f), user, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if options['errors']:
+            with open(options['errors'], 'w', encoding='utf-8') as f:
+                for error in report['errors']:
+                    f.write(json.dumps(error) + '\n')
+        else:
+            for error in report['errors'][:20]:
+                self.stdout.write(self.style.WARNING(f"  row {error['row']} ({error['name']}): {error['errors']}"))
+            if len(report['errors']) > 20:
+                self.stdout.write(f"  ... and {len(report['errors']) - 20} more; use --errors to save them all")
+
+        prefix = 'Would import' if options['dry_run'] else 'Imported'
+        style = self.style.SUCCESS if not report['failed'] else self.style.ERROR
+        self.stdout.write(style(
+            f"{prefix} {report['total']} rows: {report['created']} created, "
+            f"{report['updated']} updated, {report['failed']} failed"
+        ))
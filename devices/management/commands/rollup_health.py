@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from devices.events import prune_status_events
+from devices.health import prune_health, rollup_health
+from devices.models import HealthRollup
+
+class Command(BaseCommand):
+    help = 'Roll up device health samples and delete health history and status events past their retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-prune', action='store_true',
+                            help='Only roll up; keep expired history')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows deleted per batch when pruning')
+
+    def handle(self, *args, **options):
+        names = dict(HealthRollup.RESOLUTIONS)
+        written = rollup_health()
+        for resolution, count in written.items():
+            self.stdout.write(f'Wrote {count} {names[resolution]} rollups')
+
+        if not options['no_prune']:
+            deleted = prune_health(batch_size=options['batch_size'])
+            for resolution, count in deleted.items():
+                label = 'raw samples' if resolution is None else f'{names[resolution]} rollups'
+                self.stdout.write(f'Deleted {count} expired {label}')
+            self.stdout.write(f'Deleted {prune_status_events()} expired status events')
+
+        self.stdout.write(self.style.SUCCESS('Device health history is up to date'))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='deviceconfiguration',
+            name='config_content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='deviceconfiguration',
+            name='backup_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='devices.configblob'),
+        ),
+        migrations.AddField(
+            model_name='deviceconfiguration',
+            name='content_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='devices.configblob'),
+        ),
+        migrations.CreateModel(
+            name='ConfigBackup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed', models.BooleanField(default=True)),
+                ('taken_at', models.DateTimeField(auto_now_add=True)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='backups', to='devices.configblob')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_backups', to='devices.device')),
+                ('taken_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['device', '-taken_at'], name='devices_backup_device_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+import hashlib
+import zlib
+
+from django.db import migrations
+
+
+def move_configs_to_blobs(apps, schema_editor):
+    ConfigBlob = apps.get_model('devices', 'ConfigBlob')
+    DeviceConfiguration = apps.get_model('devices', 'DeviceConfiguration')
+
+    def get_blob(text):
+        encoded = text.encode('utf-8')
+        blob, _ = ConfigBlob.objects.get_or_create(
+            sha256=hashlib.sha256(encoded).hexdigest(),
+            defaults={'data': zlib.compress(encoded, 6), 'size': len(encoded)},
+        )
+        return blob
+
+    configurations = DeviceConfiguration.objects.filter(content_blob__isnull=True)
+    for configuration in configurations.iterator(chunk_size=500):
+        configuration.content_blob = get_blob(configuration.config_content)
+        configuration.config_content = ''
+        if configuration.backup_config:
+            configuration.backup_blob = get_blob(configuration.backup_config)
+            configuration.backup_config = ''
+        configuration.save(update_fields=['content_blob', 'config_content', 'backup_blob', 'backup_config'])
+
+
+def move_blobs_to_configs(apps, schema_editor):
+    DeviceConfiguration = apps.get_model('devices', 'DeviceConfiguration')
+
+    configurations = DeviceConfiguration.objects.filter(content_blob__isnull=False).select_related('content_blob', 'backup_blob')
+    for configuration in configurations.iterator(chunk_size=500):
+        configuration.config_content = zlib.decompress(bytes(configuration.content_blob.data)).decode('utf-8')
+        if configuration.backup_blob_id:
+            configuration.backup_config = zlib.decompress(bytes(configuration.backup_blob.data)).decode('utf-8')
+        configuration.content_blob = None
+        configuration.backup_blob = None
+        configuration.save(update_fields=['content_blob', 'config_content', 'backup_blob', 'backup_config'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_config_store'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_configs_to_blobs, move_blobs_to_configs),
+    ]
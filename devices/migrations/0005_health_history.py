@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0004_backup_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sampled_at', models.DateTimeField(db_index=True)),
+                ('reachable', models.BooleanField()),
+                ('port_open', models.BooleanField()),
+                ('latency', models.FloatField(null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_samples', to='devices.device')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HealthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(60, '1m'), (3600, '1h'), (86400, '1d')])),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField()),
+                ('reachable', models.PositiveIntegerField()),
+                ('port_open', models.PositiveIntegerField()),
+                ('latency_count', models.PositiveIntegerField()),
+                ('latency_sum', models.FloatField()),
+                ('latency_min', models.FloatField(null=True)),
+                ('latency_max', models.FloatField(null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_rollups', to='devices.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='devices_rollup_bucket_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='healthrollup',
+            constraint=models.UniqueConstraint(fields=('device', 'resolution', 'bucket'), name='devices_rollup_device_uniq'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0005_health_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProbeSchedule',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='probe_schedule', serialize=False, to='devices.device')),
+                ('interval', models.FloatField()),
+                ('next_probe_at', models.DateTimeField(db_index=True)),
+                ('last_probed_at', models.DateTimeField(blank=True, null=True)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('flap_score', models.FloatField(default=0.0)),
+            ],
+        ),
+    ]
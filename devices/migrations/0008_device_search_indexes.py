@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+TRIGRAM_FIELDS = ['name', 'location', 'vendor', 'model']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # UPPER() matches what icontains/istartswith compile to on PostgreSQL.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS devices_device_{field}_trgm '
+            f'ON devices_device USING gin (UPPER({field}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS devices_device_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0007_status_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['status', 'name'], name='devices_device_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['device_type', 'name'], name='devices_device_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['vendor', 'name'], name='devices_device_vendor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['ip_address'], name='devices_device_ip_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
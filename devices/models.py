@@ -1,3 +1,4 @@
+import zlib
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -39,18 +40,46 @@ class Device(models.Model):
 
     class Meta:
         ordering = ['name']
+        # Exact filters, led by the filtered column and then the default
+        # ordering so a filtered page needs no sort, and subnet lookups.
+        # The PostgreSQL trigram indexes for search are in migration 0008.
+        indexes = [
+            models.Index(fields=['status', 'name'], name='devices_device_status_idx'),
+            models.Index(fields=['device_type', 'name'], name='devices_device_type_idx'),
+            models.Index(fields=['vendor', 'name'], name='devices_device_vendor_idx'),
+            models.Index(fields=['ip_address'], name='devices_device_ip_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.ip_address})"
 
+class ConfigBlob(models.Model):
+    """
+    A distinct configuration text, stored once, keyed by its SHA-256.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()  # zlib-compressed UTF-8
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+    @property
+    def text(self):
+        return zlib.decompress(bytes(self.data)).decode('utf-8')
+
 class DeviceConfiguration(models.Model):
     device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='configurations')
     config_name = models.CharField(max_length=100)
-    config_content = models.TextField()
+    # Legacy inline copies; new rows keep their content in the blobs below.
+    config_content = models.TextField(blank=True)
+    content_blob = models.ForeignKey(ConfigBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     applied_by = models.ForeignKey(User, on_delete=models.CASCADE)
     applied_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     backup_config = models.TextField(blank=True)
+    backup_blob = models.ForeignKey(ConfigBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
 
     class Meta:
         ordering = ['-applied_at']
@@ -58,6 +87,60 @@ class DeviceConfiguration(models.Model):
     def __str__(self):
         return f"{self.device.name} - {self.config_name}"
 
+    def get_content(self):
+        return self.content_blob.text if self.content_blob_id else self.config_content
+
+    def get_backup_config(self):
+        return self.backup_blob.text if self.backup_blob_id else self.backup_config
+
+class BackupRun(models.Model):
+    """
+    A fleet-wide configuration backup, resumable until every device is done.
+    """
+    RUN_STATUS = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=20, choices=RUN_STATUS, default='pending')
+    device_ids = models.JSONField(default=list)
+    total = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=dict, blank=True)
+    report = models.JSONField(null=True, blank=True)
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Backup run {self.id} ({self.status})"
+
+class ConfigBackup(models.Model):
+    """
+    One backup of a device's running config: a pointer to a ``ConfigBlob``.
+    """
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='config_backups')
+    blob = models.ForeignKey(ConfigBlob, on_delete=models.PROTECT, related_name='backups')
+    run = models.ForeignKey(BackupRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='backups')
+    changed = models.BooleanField(default=True)
+    taken_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    taken_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['device', '-taken_at'], name='devices_backup_device_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.device.name} - {self.taken_at}"
+
 class DeviceCommand(models.Model):
     COMMAND_STATUS = [
         ('pending', 'Pending'),
@@ -80,3 +163,88 @@ class DeviceCommand(models.Model):
 
     def __str__(self):
         return f"{self.device.name} - {self.command[:50]}..."
+
+class HealthSample(models.Model):
+    """
+    One probe result from a status sweep. Kept briefly; queries use rollups.
+    """
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='health_samples')
+    sampled_at = models.DateTimeField(db_index=True)
+    reachable = models.BooleanField()
+    port_open = models.BooleanField()
+    latency = models.FloatField(null=True)  # seconds
+
+class HealthRollup(models.Model):
+    """
+    Probe results for one device aggregated over a fixed bucket.
+
+    Counts and latency sums are stored rather than ratios and averages, so
+    coarser rollups and range summaries are plain sums of finer ones.
+    """
+    MINUTE = 60
+    HOUR = 3600
+    DAY = 86400
+    RESOLUTIONS = [
+        (MINUTE, '1m'),
+        (HOUR, '1h'),
+        (DAY, '1d'),
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='health_rollups')
+    resolution = models.PositiveIntegerField(choices=RESOLUTIONS)
+    bucket = models.DateTimeField()
+    samples = models.PositiveIntegerField()
+    reachable = models.PositiveIntegerField()
+    port_open = models.PositiveIntegerField()
+    latency_count = models.PositiveIntegerField()
+    latency_sum = models.FloatField()
+    latency_min = models.FloatField(null=True)
+    latency_max = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'resolution', 'bucket'], name='devices_rollup_device_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket'], name='devices_rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.device_id} {self.get_resolution_display()} {self.bucket}"
+
+class ProbeSchedule(models.Model):
+    """
+    When a device is next due for a status probe, and why.
+    """
+    device = models.OneToOneField(Device, on_delete=models.CASCADE, primary_key=True, related_name='probe_schedule')
+    interval = models.FloatField()  # seconds, before jitter
+    next_probe_at = models.DateTimeField(db_index=True)
+    last_probed_at = models.DateTimeField(null=True, blank=True)
+    failures = models.PositiveIntegerField(default=0)  # consecutive probes with the port closed
+    flap_score = models.FloatField(default=0.0)  # decaying count of status changes
+
+    def __str__(self):
+        return f"{self.device_id} every {self.interval:.0f}s, next {self.next_probe_at}"
+
+class StatusEvent(models.Model):
+    """
+    A device status transition or command completion, in stream order.
+
+    The primary key doubles as the Server-Sent Events id that clients
+    resume from.
+    """
+    EVENT_KINDS = [
+        ('status', 'Status change'),
+        ('command', 'Command completed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=EVENT_KINDS)
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='status_events')
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.kind} event {self.id} for device {self.device_id}"
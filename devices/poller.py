@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .events import record_events, status_change_events
+from .health import record_health_samples, rollup_health
+from .icmp import ping_many
+from .models import Device
+from .stats import invalidate_device_statistics
+
+ProbeResult = namedtuple('ProbeResult', ['device_id', 'reachable', 'port_open', 'latency'])
+
+
+def get_poll_concurrency():
+    return getattr(settings, 'DEVICE_POLL_CONCURRENCY', 200)
+
+
+def get_poll_timeout():
+    return getattr(settings, 'DEVICE_POLL_TIMEOUT', 5.0)
+
+
+def get_write_batch_size():
+    return getattr(settings, 'DEVICE_POLL_WRITE_BATCH_SIZE', 500)
+
+
+def get_poll_icmp():
+    return getattr(settings, 'DEVICE_POLL_ICMP', True)
+
+
+async def probe_tcp(ip_address, port, timeout):
+    """
+    Probe a device with an async TCP connect to its SSH port.
+
+    A refused connection still proves the host is up, so reachability and
+    port state are reported separately. Latency is the connect time in
+    seconds, or None when the host did not answer at all.
+    """
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(ip_address, port), timeout=timeout
+        )
+    except ConnectionRefusedError:
+        return True, False, time.perf_counter() - started
+    except (asyncio.TimeoutError, OSError):
+        return False, False, None
+
+    latency = time.perf_counter() - started
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True, True, latency
+
+
+async def probe_devices(targets, concurrency, timeout):
+    """
+    Probe ``(device_id, ip_address, port)`` targets concurrently.
+
+    At most ``concurrency`` connects are in flight at any time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(device_id, ip_address, port):
+        async with semaphore:
+            reachable, port_open, latency = await probe_tcp(ip_address, port, timeout)
+        return ProbeResult(device_id, reachable, port_open, latency)
+
+    return await asyncio.gather(*(probe(*target) for target in targets))
+
+
+def confirm_with_icmp(results, addresses, timeout):
+    """
+    Ping the devices whose SSH port did not answer at all.
+
+    A device that silently drops connections to its SSH port may still
+    answer ICMP echo, so it is up even though the port is not open. All of
+    them are pinged in one batch; without an ICMP socket this is a no-op.
+    """
+    silent = [addresses[result.device_id] for result in results if not result.reachable]
+    if not silent:
+        return results
+    rtts = ping_many(silent, timeout=timeout, tcp_fallback=False)
+    confirmed = []
+    for result in results:
+        rtt = rtts.get(addresses[result.device_id]) if not result.reachable else None
+        confirmed.append(result._replace(reachable=True, latency=rtt) if rtt is not None else result)
+    return confirmed
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def write_statuses(results, current_statuses, seen_at, batch_size=None):
+    """
+    Persist probe results in chunks, touching only ``status`` and ``last_seen``.
+
+    Devices whose status changed are written with one ``bulk_update`` per
+    chunk; the rest only get ``last_seen`` bumped with one ``UPDATE`` per
+    chunk. ``updated_at`` is left alone since nothing user-editable changed.
+    Each status change is also recorded as a ``StatusEvent`` for live
+    subscribers. Returns the number of devices whose status changed.
+    """
+    if batch_size is None:
+        batch_size = get_write_batch_size()
+
+    changed = []
+    unchanged_ids = []
+    for result in results:
+        new_status = 'online' if result.port_open else 'offline'
+        if current_statuses.get(result.device_id) == new_status:
+            unchanged_ids.append(result.device_id)
+        else:
+            changed.append(Device(id=result.device_id, status=new_status, last_seen=seen_at))
+
+    with transaction.atomic():
+        for chunk in chunked(changed, batch_size):
+            Device.objects.bulk_update(chunk, ['status', 'last_seen'])
+        for chunk in chunked(unchanged_ids, batch_size):
+            Device.objects.filter(id__in=chunk).update(last_seen=seen_at)
+        record_events(status_change_events(
+            (device.id, current_statuses.get(device.id), device.status) for device in changed
+        ))
+
+    # bulk_update() bypasses post_save, so drop cached statistics here.
+    if changed:
+        invalidate_device_statistics()
+    return len(changed)
+
+
+def run_sweep(queryset=None, concurrency=None, timeout=None, rollup=True):
+    """
+    Probe every device in ``queryset`` and store the resulting status.
+
+    Each result is also kept as a health sample and, unless ``rollup`` is
+    false, the health rollups are brought up to date. Returns a report dict
+    with the per-sweep timing and success/failure counts.
+    """
+    if queryset is None:
+        queryset = Device.objects.all()
+    if concurrency is None:
+        concurrency = get_poll_concurrency()
+    if timeout is None:
+        timeout = get_poll_timeout()
+
+    started = time.perf_counter()
+    rows = list(queryset.values_list('id', 'ip_address', 'ssh_port', 'status'))
+    current_statuses = {row[0]: row[3] for row in rows}
+    targets = [row[:3] for row in rows]
+    results = asyncio.run(probe_devices(targets, concurrency, timeout))
+    if get_poll_icmp():
+        results = confirm_with_icmp(results, {row[0]: row[1] for row in rows}, timeout)
+    probe_duration = time.perf_counter() - started
+
+    seen_at = timezone.now()
+    changed = write_statuses(results, current_statuses, seen_at)
+    record_health_samples(results, seen_at)
+    if rollup:
+        rollup_health(seen_at)
+
+    online = sum(1 for result in results if result.port_open)
+    return {
+        'total': len(results),
+        'online': online,
+        'offline': len(results) - online,
+        'unreachable': sum(1 for result in results if not result.reachable),
+        'changed': changed,
+        'probe_duration': round(probe_duration, 3),
+        'duration': round(time.perf_counter() - started, 3),
+        'results': results,
+    }
@@ -0,0 +1,242 @@
+"""
+Adaptive device probe scheduling.
+
+Instead of sweeping the whole fleet on one cycle, every device has its own
+probe interval:
+
+* the base interval depends on the device type (core gear more often than
+  access points);
+* a device whose status just changed, or that keeps flapping, is probed at
+  the minimum interval so changes are confirmed quickly;
+* a device that stays offline backs off exponentially up to the maximum
+  interval;
+* every next-due time is jittered, and new devices are spread over their
+  first interval, so probes do not arrive in bursts.
+
+``ProbeScheduler`` keeps the schedule in a heap keyed on the next-due time
+and persists it in ``ProbeSchedule`` so restarts pick up where they left off.
+"""
+import heapq
+import random
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .health import floor_time, rollup_health
+from .models import Device, HealthRollup, ProbeSchedule
+from .poller import run_sweep
+
+DEFAULT_TYPE_INTERVALS = {
+    'router': 30,
+    'firewall': 30,
+    'load_balancer': 30,
+    'switch': 60,
+    'access_point': 120,
+}
+SCHEDULE_FIELDS = ['interval', 'next_probe_at', 'last_probed_at', 'failures', 'flap_score']
+
+
+def get_type_intervals():
+    return {**DEFAULT_TYPE_INTERVALS, **getattr(settings, 'PROBE_TYPE_INTERVALS', {})}
+
+
+def get_min_interval():
+    return getattr(settings, 'PROBE_MIN_INTERVAL', 10)
+
+
+def get_max_interval():
+    return getattr(settings, 'PROBE_MAX_INTERVAL', 3600)
+
+
+def get_jitter():
+    return getattr(settings, 'PROBE_JITTER', 0.1)
+
+
+def get_flap_decay():
+    return getattr(settings, 'PROBE_FLAP_DECAY', 0.8)
+
+
+def get_flap_threshold():
+    return getattr(settings, 'PROBE_FLAP_THRESHOLD', 1.5)
+
+
+def base_interval(device_type):
+    return get_type_intervals().get(device_type, 60)
+
+
+def jittered(seconds, rng=random):
+    jitter = get_jitter()
+    return seconds * rng.uniform(1 - jitter, 1 + jitter)
+
+
+def initial_schedule(device_id, device_type, now, rng=random):
+    """
+    Schedule a device that has never been probed somewhere in its first interval.
+    """
+    interval = base_interval(device_type)
+    return ProbeSchedule(
+        device_id=device_id,
+        interval=interval,
+        next_probe_at=now + timedelta(seconds=rng.uniform(0, interval)),
+    )
+
+
+def plan_next(schedule, device_type, previous_status, result, now, rng=random):
+    """
+    Update ``schedule`` after a probe and return the device's new status.
+
+    ``flap_score`` decays by ``PROBE_FLAP_DECAY`` per probe and gains one
+    per status change, so it measures recent instability rather than
+    lifetime history.
+    """
+    status = 'online' if result.port_open else 'offline'
+    changed = previous_status is not None and status != previous_status
+    schedule.flap_score = schedule.flap_score * get_flap_decay() + (1.0 if changed else 0.0)
+    schedule.failures = 0 if result.port_open else schedule.failures + 1
+
+    min_interval = get_min_interval()
+    if changed or schedule.flap_score >= get_flap_threshold():
+        interval = min_interval
+    elif schedule.failures > 1:
+        interval = base_interval(device_type) * 2 ** min(schedule.failures - 1, 20)
+    else:
+        interval = base_interval(device_type)
+
+    schedule.interval = min(max(interval, min_interval), get_max_interval())
+    schedule.last_probed_at = now
+    schedule.next_probe_at = now + timedelta(seconds=jittered(schedule.interval, rng))
+    return status
+
+
+class ProbeScheduler:
+    """
+    Probe devices as they fall due, in batches, from a heap of next-due times.
+
+    Heap entries are never removed in place; an entry whose time no longer
+    matches the device's schedule is skipped when it is popped.
+    """
+
+    def __init__(self, concurrency=None, timeout=None, batch_size=500, rng=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.rng = rng or random.Random()
+        self.heap = []
+        self.schedules = {}
+        self.devices = {}
+
+    def sync(self, now=None):
+        """
+        Reload devices and schedules, creating schedules for new devices.
+        """
+        if now is None:
+            now = timezone.now()
+        self.devices = {
+            device_id: (device_type, status)
+            for device_id, device_type, status in Device.objects.values_list('id', 'device_type', 'status')
+        }
+        self.schedules = {
+            schedule.device_id: schedule
+            for schedule in ProbeSchedule.objects.filter(device_id__in=list(self.devices))
+        }
+        missing = [
+            initial_schedule(device_id, device_type, now, self.rng)
+            for device_id, (device_type, _) in self.devices.items() if device_id not in self.schedules
+        ]
+        ProbeSchedule.objects.bulk_create(missing, batch_size=self.batch_size, ignore_conflicts=True)
+        self.schedules.update((schedule.device_id, schedule) for schedule in missing)
+
+        self.heap = [(schedule.next_probe_at, device_id) for device_id, schedule in self.schedules.items()]
+        heapq.heapify(self.heap)
+        return len(missing)
+
+    def pop_due(self, now, limit=None):
+        limit = limit or self.batch_size
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < limit:
+            when, device_id = heapq.heappop(self.heap)
+            schedule = self.schedules.get(device_id)
+            if schedule is not None and schedule.next_probe_at == when:
+                due.append(device_id)
+        return due
+
+    def seconds_until_due(self, now):
+        if not self.heap:
+            return None
+        return max((self.heap[0][0] - now).total_seconds(), 0.0)
+
+    def probe_rate(self):
+        """
+        Average probes per minute the current schedule generates.
+        """
+        return sum(60.0 / schedule.interval for schedule in self.schedules.values())
+
+    def probe(self, device_ids):
+        """
+        Probe ``device_ids`` now, reschedule them and persist their schedules.
+        """
+        report = run_sweep(
+            Device.objects.filter(id__in=device_ids),
+            concurrency=self.concurrency,
+            timeout=self.timeout,
+            rollup=False,
+        )
+        now = timezone.now()
+        updated = []
+        for result in report['results']:
+            schedule = self.schedules.get(result.device_id)
+            if schedule is None:
+                continue
+            device_type, previous_status = self.devices[result.device_id]
+            status = plan_next(schedule, device_type, previous_status, result, now, self.rng)
+            self.devices[result.device_id] = (device_type, status)
+            heapq.heappush(self.heap, (schedule.next_probe_at, result.device_id))
+            updated.append(schedule)
+        ProbeSchedule.objects.bulk_update(updated, SCHEDULE_FIELDS, batch_size=self.batch_size)
+        return report
+
+    def run_due(self, now=None):
+        """
+        Probe every device that is due, in batches. Returns the sweep reports.
+        """
+        if now is None:
+            now = timezone.now()
+        reports = []
+        while True:
+            due = self.pop_due(now)
+            if not due:
+                return reports
+            reports.append(self.probe(due))
+
+    def run(self, stop=None, resync_interval=60, max_sleep=5.0, on_batch=None):
+        """
+        Probe devices as they fall due until ``stop`` (a ``threading.Event``) is set.
+
+        Devices and schedules are reloaded every ``resync_interval`` seconds
+        to pick up added, removed and edited devices, and the health rollups
+        are brought up to date once per minute.
+        """
+        stop = stop or threading.Event()
+        next_sync = 0.0
+        rolled_up_to = None
+        while not stop.is_set():
+            if time.monotonic() >= next_sync:
+                self.sync()
+                next_sync = time.monotonic() + resync_interval
+
+            now = timezone.now()
+            due = self.pop_due(now)
+            if due:
+                report = self.probe(due)
+                if on_batch is not None:
+                    on_batch(report)
+                continue
+
+            minute = floor_time(now, HealthRollup.MINUTE)
+            if minute != rolled_up_to:
+                rollup_health(now)
+                rolled_up_to = minute
+
+            wait = self.seconds_until_due(timezone.now())
+            stop.wait(max_sleep if wait is None else min(wait, max_sleep))
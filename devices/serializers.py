@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Device, DeviceCommand
+from .models import BackupRun, Device, DeviceCommand, DeviceConfiguration
 
 class DeviceSerializer(serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
@@ -17,6 +17,16 @@ class DeviceSerializer(serializers.ModelSerializer):
             'ssh_password': {'write_only': True}
         }
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Load exactly what the fields above read, in one query.
+        return queryset.select_related('created_by').only(
+            'id', 'name', 'device_type', 'ip_address', 'mac_address',
+            'location', 'vendor', 'model', 'os_version', 'status',
+            'ssh_port', 'ssh_username', 'description', 'created_by__username',
+            'created_at', 'updated_at', 'last_seen'
+        )
+
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
@@ -32,3 +42,76 @@ class DeviceCommandSerializer(serializers.ModelSerializer):
             'executed_by_username', 'executed_at', 'completed_at', 'error_message'
         ]
         read_only_fields = ('id', 'executed_by', 'executed_at', 'completed_at', 'output', 'status', 'error_message', 'device_name', 'executed_by_username')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('device', 'executed_by').only(
+            'id', 'device__name', 'command', 'output', 'status',
+            'executed_by__username', 'executed_at', 'completed_at', 'error_message'
+        )
+
+class DeviceConfigurationSerializer(serializers.ModelSerializer):
+    applied_by_username = serializers.CharField(source='applied_by.username', read_only=True)
+    content_sha256 = serializers.CharField(source='content_blob.sha256', read_only=True, default=None)
+    content_size = serializers.IntegerField(source='content_blob.size', read_only=True, default=None)
+
+    class Meta:
+        model = DeviceConfiguration
+        fields = [
+            'id', 'config_name', 'applied_by_username', 'applied_at',
+            'is_active', 'content_sha256', 'content_size'
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # History listings never need the config bodies themselves.
+        return queryset.select_related('applied_by', 'content_blob').only(
+            'id', 'config_name', 'applied_by__username', 'applied_at',
+            'is_active', 'content_blob__sha256', 'content_blob__size'
+        )
+
+class DeviceSelectionSerializer(serializers.Serializer):
+    device_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    status = serializers.ChoiceField(choices=Device.STATUS_CHOICES, required=False)
+    device_type = serializers.ChoiceField(choices=Device.DEVICE_TYPES, required=False)
+    vendor = serializers.CharField(required=False)
+    location = serializers.CharField(required=False)
+
+    filter_fields = ('status', 'device_type', 'vendor', 'location')
+
+    def has_selection(self, attrs):
+        return 'device_ids' in attrs or any(field in attrs for field in self.filter_fields)
+
+    def get_device_queryset(self):
+        queryset = Device.objects.all()
+        if 'device_ids' in self.validated_data:
+            queryset = queryset.filter(id__in=self.validated_data['device_ids'])
+        filters = {field: self.validated_data[field] for field in self.filter_fields if field in self.validated_data}
+        if 'vendor' in filters:
+            filters['vendor__iexact'] = filters.pop('vendor')
+        return queryset.filter(**filters)
+
+class BulkCommandSerializer(DeviceSelectionSerializer):
+    command = serializers.CharField()
+
+    def validate(self, attrs):
+        if not self.has_selection(attrs):
+            raise serializers.ValidationError('Provide device_ids or at least one device filter')
+        return attrs
+
+class BackupRunSerializer(serializers.ModelSerializer):
+    started_by_username = serializers.CharField(source='started_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = BackupRun
+        fields = [
+            'id', 'status', 'total', 'succeeded', 'failed', 'errors', 'report',
+            'started_by_username', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # device_ids can hold thousands of entries and is not rendered.
+        return queryset.select_related('started_by').defer('device_ids')
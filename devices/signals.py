@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .config_store import store_config
+from .ip_index import get_ip_index
+from .models import Device, DeviceConfiguration
+from .stats import invalidate_device_statistics
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+def invalidate_statistics_on_device_change(sender, **kwargs):
+    invalidate_device_statistics()
+
+
+@receiver(post_save, sender=Device)
+def update_ip_index_on_device_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'ip_address' not in update_fields:
+        return
+    # After commit, so a rolled-back save never reaches the index.
+    device_id, ip_address = instance.pk, instance.ip_address
+    transaction.on_commit(lambda: get_ip_index().apply(device_id, ip_address))
+
+
+@receiver(post_delete, sender=Device)
+def update_ip_index_on_device_delete(sender, instance, **kwargs):
+    device_id = instance.pk
+    transaction.on_commit(lambda: get_ip_index().apply(device_id, None))
+
+
+@receiver(pre_save, sender=DeviceConfiguration)
+def store_configuration_blobs(sender, instance, **kwargs):
+    # Inline text goes to the shared blob store; the columns stay empty.
+    if instance.config_content:
+        instance.content_blob = store_config(instance.config_content)
+        instance.config_content = ''
+    if instance.backup_config:
+        instance.backup_blob = store_config(instance.backup_config)
+        instance.backup_config = ''
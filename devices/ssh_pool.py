@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import paramiko
+from django.conf import settings
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no session to a host frees up within the wait timeout.
+    """
+
+
+class SSHConnectionPool:
+    """
+    Keep authenticated SSH transports open and hand them out per device.
+
+    Connections are keyed by ``(host, port, username)``. At most
+    ``max_sessions_per_host`` connections to one key are checked out at a
+    time, idle connections older than ``idle_timeout`` seconds are closed,
+    and once more than ``max_idle`` connections sit idle across all hosts
+    the least recently used ones are evicted.
+    """
+
+    def __init__(self, max_sessions_per_host=4, idle_timeout=300, max_idle=256,
+                 connect_timeout=10, wait_timeout=30, client_factory=None):
+        self.max_sessions_per_host = max_sessions_per_host
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self.wait_timeout = wait_timeout
+        self.client_factory = client_factory or self._default_client
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # Idle connections in LRU order: oldest release first.
+        self._idle = OrderedDict()
+        self._in_use = {}
+        self.stats = {'created': 0, 'reused': 0, 'evicted': 0, 'discarded': 0}
+
+    @staticmethod
+    def _default_client():
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        return client
+
+    @staticmethod
+    def _key(device):
+        return (device.ip_address, device.ssh_port, device.ssh_username)
+
+    @staticmethod
+    def is_healthy(client):
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except (paramiko.SSHException, OSError, EOFError):
+            return False
+        return True
+
+    def _connect(self, device, deadline=None):
+        timeouts = {'timeout': self.connect_timeout}
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(f'No time left to connect to {device.ip_address}:{device.ssh_port}')
+            # The banner and authentication waits count against the deadline too.
+            timeouts = {
+                'timeout': min(self.connect_timeout, remaining),
+                'banner_timeout': remaining,
+                'auth_timeout': remaining,
+            }
+        client = self.client_factory()
+        client.connect(
+            hostname=device.ip_address,
+            port=device.ssh_port,
+            username=device.ssh_username,
+            password=device.ssh_password,
+            **timeouts,
+        )
+        return client
+
+    def _close(self, client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def _expire_idle(self, now):
+        """
+        Drop idle connections past ``idle_timeout`` or beyond ``max_idle``.
+
+        Must be called with the lock held; returns the clients to close.
+        """
+        expired = []
+        for idle_key in list(self._idle):
+            if now - self._idle[idle_key][1] > self.idle_timeout:
+                expired.append(self._idle.pop(idle_key)[0])
+        while len(self._idle) > self.max_idle:
+            expired.append(self._idle.popitem(last=False)[1][0])
+        self.stats['evicted'] += len(expired)
+        return expired
+
+    def _take_idle(self, key):
+        # Prefer the most recently released connection; it is the least
+        # likely to have been dropped by the device.
+        for idle_key in reversed(self._idle):
+            if idle_key[0] == key:
+                return self._idle.pop(idle_key)[0]
+        return None
+
+    def acquire(self, device, deadline=None):
+        """
+        Check out a connection for ``device``, connecting if none is idle.
+
+        ``deadline``, a ``time.monotonic()`` value, caps both the wait for
+        a free session and the connect.
+        """
+        key = self._key(device)
+        wait_deadline = time.monotonic() + self.wait_timeout
+        if deadline is not None:
+            wait_deadline = min(wait_deadline, deadline)
+        with self._lock:
+            while self._in_use.get(key, 0) >= self.max_sessions_per_host:
+                remaining = wait_deadline - time.monotonic()
+                if remaining <= 0 or not self._released.wait(remaining):
+                    raise PoolTimeout(f'No free SSH session for {device.ip_address}:{device.ssh_port}')
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            expired = self._expire_idle(time.monotonic())
+            client = self._take_idle(key)
+
+        for stale in expired:
+            self._close(stale)
+
+        try:
+            while client is not None and not self.is_healthy(client):
+                self._close(client)
+                with self._lock:
+                    self.stats['discarded'] += 1
+                    client = self._take_idle(key)
+            if client is None:
+                client = self._connect(device, deadline)
+                with self._lock:
+                    self.stats['created'] += 1
+            else:
+                with self._lock:
+                    self.stats['reused'] += 1
+        except Exception:
+            self._release_slot(key)
+            raise
+        return client
+
+    def _release_slot(self, key):
+        with self._lock:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            self._released.notify_all()
+
+    def release(self, device, client, discard=False):
+        key = self._key(device)
+        if discard:
+            self._close(client)
+            with self._lock:
+                self.stats['discarded'] += 1
+        else:
+            with self._lock:
+                # The id() suffix keeps several idle connections per host apart.
+                self._idle[(key, id(client))] = (client, time.monotonic())
+                expired = self._expire_idle(time.monotonic())
+            for stale in expired:
+                self._close(stale)
+        self._release_slot(key)
+
+    @contextmanager
+    def session(self, device, deadline=None):
+        """
+        Check out a connected ``paramiko.SSHClient`` for ``device``.
+
+        Transport-level failures inside the block discard the connection
+        instead of returning it to the pool.
+        """
+        client = self.acquire(device, deadline)
+        try:
+            yield client
+        except (paramiko.SSHException, OSError, EOFError):
+            self.release(device, client, discard=True)
+            raise
+        except BaseException:
+            self.release(device, client)
+            raise
+        else:
+            self.release(device, client)
+
+    def close_all(self):
+        with self._lock:
+            clients = [client for client, _ in self._idle.values()]
+            self._idle.clear()
+        for client in clients:
+            self._close(client)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ssh_pool():
+    """
+    Return the process-wide SSH connection pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHConnectionPool(
+                max_sessions_per_host=getattr(settings, 'SSH_POOL_MAX_SESSIONS_PER_HOST', 4),
+                idle_timeout=getattr(settings, 'SSH_POOL_IDLE_TIMEOUT', 300),
+                max_idle=getattr(settings, 'SSH_POOL_MAX_IDLE', 256),
+            )
+        return _pool
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Device
+
+STATISTICS_CACHE_KEY = 'devices:statistics'
+STATISTICS_HITS_KEY = 'devices:statistics:hits'
+STATISTICS_MISSES_KEY = 'devices:statistics:misses'
+
+
+def compute_device_statistics(using=None):
+    """
+    Compute fleet statistics with database-side aggregation.
+
+    Uses three queries regardless of fleet size: one conditional aggregate
+    for the status counts and one ``GROUP BY`` each for device types and
+    vendors. No ``Device`` instances are built. ``using`` picks the database
+    alias, for benchmarks run against a scratch database.
+    """
+    devices = Device.objects.using(using)
+    counts = devices.aggregate(
+        total_devices=Count('id'),
+        online_devices=Count('id', filter=Q(status='online')),
+        offline_devices=Count('id', filter=Q(status='offline')),
+        maintenance_devices=Count('id', filter=Q(status='maintenance')),
+        error_devices=Count('id', filter=Q(status='error')),
+    )
+    # order_by() drops Meta.ordering, which would otherwise leak into GROUP BY.
+    grouped = devices.order_by()
+    device_types = dict(grouped.values_list('device_type').annotate(count=Count('id')))
+    vendors = dict(grouped.values_list('vendor').annotate(count=Count('id')))
+
+    total_devices = counts['total_devices']
+    return {
+        **counts,
+        'device_types': device_types,
+        'vendors': vendors,
+        'uptime_percentage': round((counts['online_devices'] / total_devices * 100), 2) if total_devices > 0 else 0
+    }
+
+
+def get_statistics_cache_ttl():
+    return getattr(settings, 'DEVICE_STATISTICS_CACHE_TTL', 30)
+
+
+def _count(key):
+    # add() is a no-op when the counter exists, so incr() never sees a miss.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_device_statistics():
+    """
+    Return fleet statistics from the cache, computing them on a miss.
+
+    Entries are dropped by ``invalidate_device_statistics`` whenever devices
+    change; the TTL only bounds staleness from writes that bypass it.
+    """
+    statistics = cache.get(STATISTICS_CACHE_KEY)
+    if statistics is not None:
+        _count(STATISTICS_HITS_KEY)
+        return statistics
+
+    _count(STATISTICS_MISSES_KEY)
+    statistics = compute_device_statistics()
+    cache.set(STATISTICS_CACHE_KEY, statistics, timeout=get_statistics_cache_ttl())
+    return statistics
+
+
+def invalidate_device_statistics():
+    cache.delete(STATISTICS_CACHE_KEY)
+
+
+def get_statistics_cache_counters():
+    counters = cache.get_many([STATISTICS_HITS_KEY, STATISTICS_MISSES_KEY])
+    hits = counters.get(STATISTICS_HITS_KEY, 0)
+    misses = counters.get(STATISTICS_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+        'ttl': get_statistics_cache_ttl(),
+    }
@@ -0,0 +1,60 @@
+from unittest import mock
+from django.test import TestCase
+from accounts.models import User
+from devices.models import ConfigBackup, ConfigBlob, Device, DeviceConfiguration
+from devices.utils import backup_device_config
+
+RUNNING_CONFIG = 'hostname core-0\ninterface Gi0/1\n description uplink\n'
+
+
+class ConfigStoreTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('netops', role='engineer')
+        self.device = Device.objects.create(
+            name='core-0', device_type='router', ip_address='10.0.0.1',
+            location='dc1', vendor='cisco', model='asr', created_by=self.user,
+        )
+
+    def test_identical_backups_share_one_blob(self):
+        with mock.patch('devices.utils.fetch_device_config', return_value=(True, RUNNING_CONFIG)):
+            self.assertEqual(backup_device_config(self.device, user=self.user), RUNNING_CONFIG)
+            backup_device_config(self.device, user=self.user)
+
+        self.assertEqual(ConfigBlob.objects.count(), 1)
+        first, second = ConfigBackup.objects.order_by('id')
+        self.assertTrue(first.changed)
+        self.assertFalse(second.changed)
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(second.blob.text, RUNNING_CONFIG)
+
+    def test_changed_backup_gets_a_new_blob(self):
+        with mock.patch('devices.utils.fetch_device_config', return_value=(True, RUNNING_CONFIG)):
+            backup_device_config(self.device)
+        with mock.patch('devices.utils.fetch_device_config', return_value=(True, RUNNING_CONFIG + 'end\n')):
+            backup_device_config(self.device)
+
+        self.assertEqual(ConfigBlob.objects.count(), 2)
+        self.assertTrue(ConfigBackup.objects.order_by('-id').first().changed)
+
+    def test_failed_backup_records_nothing(self):
+        with mock.patch('devices.utils.fetch_device_config', return_value=(False, 'timed out')):
+            self.assertIsNone(backup_device_config(self.device))
+        self.assertFalse(ConfigBackup.objects.exists())
+
+    def test_new_configurations_are_stored_as_blobs(self):
+        first = DeviceConfiguration.objects.create(
+            device=self.device, config_name='baseline', config_content=RUNNING_CONFIG,
+            backup_config=RUNNING_CONFIG, applied_by=self.user,
+        )
+        second = DeviceConfiguration.objects.create(
+            device=self.device, config_name='again', config_content=RUNNING_CONFIG, applied_by=self.user,
+        )
+
+        first.refresh_from_db()
+        self.assertEqual(first.config_content, '')
+        self.assertEqual(first.backup_config, '')
+        self.assertEqual(first.content_blob_id, second.content_blob_id)
+        self.assertEqual(first.backup_blob_id, first.content_blob_id)
+        self.assertEqual(first.get_content(), RUNNING_CONFIG)
+        self.assertEqual(ConfigBlob.objects.count(), 1)
@@ -0,0 +1,145 @@
+import socket
+import struct
+from unittest import mock
+from django.test import SimpleTestCase
+from devices import icmp
+
+LOOPBACK_HOSTS = ['127.0.0.1', '127.0.0.2', '127.0.0.3', '127.1.2.3']
+
+real_socket = socket.socket
+
+
+def refuse_icmp(*socket_types):
+    """
+    A ``socket.socket`` that raises PermissionError for ICMP sockets of the
+    given types, like an unprivileged process, and opens everything else.
+    """
+
+    def open_socket(family=-1, type=-1, proto=-1, fileno=None):
+        if proto == socket.IPPROTO_ICMP and type in socket_types:
+            raise PermissionError(1, 'Operation not permitted')
+        return real_socket(family, type, proto, fileno)
+
+    return open_socket
+
+
+def ip_header(length):
+    # Only the header length nibble is read.
+    return bytes([0x45]) + bytes(19) if length == 20 else bytes([0x46]) + bytes(23)
+
+
+def echo_reply(identifier, sequence, icmp_type=icmp.ECHO_REPLY):
+    return struct.pack('!BBHHH', icmp_type, 0, 0, identifier, sequence) + icmp.PAYLOAD
+
+
+class FakeSocket:
+    """
+    Hands out queued ``(packet, address)`` pairs, then would block.
+    """
+
+    def __init__(self, packets):
+        self.packets = list(packets)
+
+    def recvfrom(self, size):
+        if not self.packets:
+            raise BlockingIOError
+        return self.packets.pop(0)
+
+
+class PingManyTests(SimpleTestCase):
+
+    def test_loopback_hosts_in_every_available_mode(self):
+        for mode in icmp.MODES:
+            with self.subTest(mode=mode):
+                opened, sock = icmp.open_icmp_socket(mode)
+                if sock is not None:
+                    sock.close()
+                if opened != mode:
+                    self.skipTest(f'{mode} ICMP sockets are not allowed here')
+                # A refused TCP connection counts as up, so no listener is needed.
+                results = icmp.ping_many(LOOPBACK_HOSTS, timeout=2, mode=mode, fallback_port=1)
+                self.assertEqual(set(results), set(LOOPBACK_HOSTS))
+                for host, rtt in results.items():
+                    self.assertIsNotNone(rtt, host)
+                    self.assertGreater(rtt, 0)
+                    self.assertLess(rtt, 2)
+
+    def test_duplicate_addresses_are_pinged_once(self):
+        results = icmp.ping_many(['127.0.0.1', '127.0.0.1', '127.0.0.2'], timeout=2, fallback_port=1)
+        self.assertEqual(set(results), {'127.0.0.1', '127.0.0.2'})
+
+    def test_falls_back_to_dgram_without_raw_sockets(self):
+        refuse_raw = refuse_icmp(socket.SOCK_RAW)
+        ping_socket = mock.MagicMock()
+
+        def open_socket(family=-1, type=-1, proto=-1, fileno=None):
+            # Stands in for a ping socket, which this host may not allow.
+            if proto == socket.IPPROTO_ICMP and type == socket.SOCK_DGRAM:
+                return ping_socket
+            return refuse_raw(family, type, proto, fileno)
+
+        with mock.patch('socket.socket', open_socket), \
+                mock.patch.object(icmp, '_ping_icmp', return_value={'127.0.0.1': 0.001}) as ping_icmp:
+            self.assertEqual(icmp.open_icmp_socket(), ('dgram', ping_socket))
+            results = icmp.ping_many(['127.0.0.1'], timeout=1)
+        self.assertEqual(ping_icmp.call_args.args[1:3], (ping_socket, 'dgram'))
+        self.assertEqual(results, {'127.0.0.1': 0.001})
+        ping_socket.close.assert_called()
+
+    def test_falls_back_to_tcp_without_icmp_sockets(self):
+        with mock.patch('socket.socket', refuse_icmp(socket.SOCK_RAW, socket.SOCK_DGRAM)):
+            self.assertEqual(icmp.open_icmp_socket(), ('tcp', None))
+            with mock.patch.object(icmp, '_ping_icmp') as ping_icmp:
+                results = icmp.ping_many(LOOPBACK_HOSTS[:2], timeout=2, fallback_port=1)
+        ping_icmp.assert_not_called()
+        self.assertTrue(all(rtt is not None for rtt in results.values()))
+
+    def test_no_tcp_fallback_reports_unreachable(self):
+        with mock.patch('socket.socket', refuse_icmp(socket.SOCK_RAW, socket.SOCK_DGRAM)):
+            results = icmp.ping_many(LOOPBACK_HOSTS[:2], timeout=1, tcp_fallback=False)
+        self.assertEqual(results, dict.fromkeys(LOOPBACK_HOSTS[:2]))
+
+
+class ReplyMatchingTests(SimpleTestCase):
+
+    def drain(self, mode, packets, pending):
+        sent_at = dict.fromkeys(pending, 0.0)
+        rtts = {}
+        icmp._drain(FakeSocket(packets), mode, 0x1234, pending, sent_at, rtts)
+        return rtts
+
+    def test_raw_replies_match_identifier_and_sequence(self):
+        pending = {'127.0.0.2': 7, '127.0.0.3': 8, '127.0.0.4': 9}
+        rtts = self.drain('raw', [
+            # Another process's ping to the same host.
+            (ip_header(20) + echo_reply(0x4321, 7), ('127.0.0.2', 0)),
+            # Our identifier, but the sequence of a different host.
+            (ip_header(20) + echo_reply(0x1234, 9), ('127.0.0.3', 0)),
+            # Our own request looped back.
+            (ip_header(20) + echo_reply(0x1234, 9, icmp.ECHO_REQUEST), ('127.0.0.4', 0)),
+            # Truncated.
+            (ip_header(20)[:12], ('127.0.0.4', 0)),
+            (ip_header(20) + echo_reply(0x1234, 7), ('127.0.0.2', 0)),
+            # IP options shift the ICMP header.
+            (ip_header(24) + echo_reply(0x1234, 8), ('127.0.0.3', 0)),
+        ], pending)
+        self.assertEqual(set(rtts), {'127.0.0.2', '127.0.0.3'})
+        self.assertEqual(pending, {'127.0.0.4': 9})
+
+    def test_dgram_replies_ignore_the_rewritten_identifier(self):
+        pending = {'127.0.0.2': 1, '127.0.0.3': 2}
+        rtts = self.drain('dgram', [
+            (echo_reply(0x9999, 1), ('127.0.0.2', 0)),
+            (echo_reply(0x9999, 5), ('127.0.0.3', 0)),
+        ], pending)
+        self.assertEqual(set(rtts), {'127.0.0.2'})
+        self.assertEqual(pending, {'127.0.0.3': 2})
+
+    def test_late_duplicate_reply_is_ignored(self):
+        pending = {'127.0.0.2': 1}
+        rtts = self.drain('raw', [
+            (ip_header(20) + echo_reply(0x1234, 1), ('127.0.0.2', 0)),
+            (ip_header(20) + echo_reply(0x1234, 1), ('127.0.0.2', 0)),
+        ], pending)
+        self.assertEqual(list(rtts), ['127.0.0.2'])
+        self.assertEqual(pending, {})
@@ -0,0 +1,48 @@
+import ipaddress
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from devices.ip_index import IPIndex
+from devices.models import Device
+
+
+class IPIndexStalenessTests(TestCase):
+    """
+    With the per-process test cache, writes this index was not told about
+    (another worker's) are picked up from the table.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('netops', role='engineer')
+        self.index = IPIndex()
+
+    def add_device(self, name, ip_address):
+        return Device.objects.create(
+            name=name, device_type='router', ip_address=ip_address,
+            location='dc1', vendor='cisco', model='asr', created_by=self.user,
+        )
+
+    def owner(self, address):
+        match = self.index.lookup(ipaddress.ip_address(address))
+        return None if match is None else match[1]
+
+    def test_picks_up_writes_made_elsewhere(self):
+        device = self.add_device('core-0', '10.0.0.1')
+        self.assertEqual(self.owner('10.0.0.1'), [device.id])
+
+        Device.objects.filter(pk=device.pk).update(ip_address='10.0.0.2', updated_at=timezone.now())
+        self.assertIsNone(self.owner('10.0.0.1'))
+        self.assertEqual(self.owner('10.0.0.2'), [device.id])
+
+        other = self.add_device('core-1', '10.0.0.3')
+        self.assertEqual(self.owner('10.0.0.3'), [other.id])
+
+        device.delete()
+        self.assertIsNone(self.owner('10.0.0.2'))
+
+    def test_unchanged_table_is_not_reloaded(self):
+        self.add_device('core-0', '10.0.0.1')
+        self.owner('10.0.0.1')
+        # Only the version check.
+        with self.assertNumQueries(1):
+            self.owner('10.0.0.1')
@@ -0,0 +1,39 @@
+from unittest import mock
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from accounts.models import User
+from devices.models import Device, DeviceCommand
+
+
+class CommandPermissionTests(APITestCase):
+
+    def setUp(self):
+        owner = User.objects.create_user('owner', role='admin')
+        self.device = Device.objects.create(
+            name='core-0', device_type='router', ip_address='10.0.0.1',
+            location='dc1', vendor='cisco', model='asr', created_by=owner,
+        )
+        self.url = reverse('device-commands', args=[self.device.id])
+
+    def post_command(self, role):
+        self.client.force_authenticate(User.objects.create_user(f'{role}-user', role=role))
+        with mock.patch('devices.views.enqueue_command') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, {'command': 'show version'}, format='json')
+        return response, enqueue
+
+    def test_viewer_cannot_run_commands(self):
+        response, enqueue = self.post_command('viewer')
+        self.assertEqual(response.status_code, 403)
+        enqueue.assert_not_called()
+        self.assertFalse(DeviceCommand.objects.exists())
+
+    def test_viewer_can_list_commands(self):
+        self.client.force_authenticate(User.objects.create_user('reader', role='viewer'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_engineer_can_run_commands(self):
+        response, enqueue = self.post_command('engineer')
+        self.assertEqual(response.status_code, 202)
+        enqueue.assert_called_once()
+        self.assertEqual(DeviceCommand.objects.get().status, 'pending')
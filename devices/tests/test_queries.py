@@ -0,0 +1,72 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from accounts.models import User
+from devices.models import BackupRun, ConfigBlob, Device, DeviceCommand, DeviceConfiguration
+
+
+class ListQueryCountTests(APITestCase):
+    """
+    Each list endpoint runs a fixed number of queries however many rows
+    it returns, so a serializer field that reaches into an unloaded
+    relation or deferred column fails here.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('lister', role='admin')
+        self.client.force_authenticate(self.user)
+        self.device = Device.objects.create(
+            name='core-0', device_type='router', ip_address='10.0.0.1',
+            location='dc1', vendor='cisco', model='asr', created_by=self.user,
+        )
+        self.rows = 0
+
+    def make_user(self):
+        # A different user per row, so related lookups cannot be shared.
+        return User.objects.create_user(f'owner-{self.rows}')
+
+    def assertListQueries(self, url, make_row, queries, existing=0):
+        for total in (1, 5):
+            while self.rows < total:
+                self.rows += 1
+                make_row()
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), total + existing)
+        return response.data['results']
+
+    def test_device_list(self):
+        def make_row():
+            owner = self.make_user()
+            Device.objects.create(
+                name=f'edge-{self.rows}', device_type='switch', ip_address=f'10.0.1.{self.rows}',
+                location='dc1', vendor='cisco', model='c9300', created_by=owner,
+            )
+
+        # ETag state, count, page.
+        results = self.assertListQueries(reverse('device-list-create'), make_row, 3, existing=1)
+        self.assertEqual({row['created_by_username'] for row in results}, {'lister'} | {f'owner-{i}' for i in range(1, 6)})
+
+    def test_device_command_list(self):
+        def make_row():
+            DeviceCommand.objects.create(device=self.device, command='show version', executed_by=self.make_user())
+
+        results = self.assertListQueries(reverse('device-commands', args=[self.device.id]), make_row, 2)
+        self.assertEqual({row['device_name'] for row in results}, {'core-0'})
+
+    def test_device_configuration_list(self):
+        def make_row():
+            blob = ConfigBlob.objects.create(sha256=f'{self.rows:064x}', data=b'', size=self.rows)
+            DeviceConfiguration.objects.create(
+                device=self.device, config_name=f'cfg-{self.rows}', content_blob=blob, applied_by=self.make_user(),
+            )
+
+        results = self.assertListQueries(reverse('device-configurations', args=[self.device.id]), make_row, 2)
+        self.assertTrue(all(row['content_sha256'] for row in results))
+
+    def test_backup_run_list(self):
+        def make_row():
+            BackupRun.objects.create(device_ids=list(range(100)), total=100, started_by=self.make_user())
+
+        results = self.assertListQueries(reverse('backup-runs'), make_row, 2)
+        self.assertTrue(all(row['started_by_username'] for row in results))
@@ -0,0 +1,225 @@
+import socket
+import threading
+import time
+from unittest import mock
+import paramiko
+from django.test import SimpleTestCase
+from devices.backups import _fetch
+from devices.models import Device
+from devices.ssh_pool import PoolTimeout, SSHConnectionPool
+
+
+class StandInServer(paramiko.ServerInterface):
+    """
+    Accepts any password and answers ``exec`` requests with ``out:<command>``.
+    ``show running-config`` is preceded by a byte every 0.1s for three
+    seconds, like a slow device.
+    """
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        def reply():
+            # Let paramiko acknowledge the request before the channel closes.
+            time.sleep(0.05)
+            if command == b'show running-config':
+                for _ in range(30):
+                    if channel.closed:
+                        return
+                    channel.sendall(b'.')
+                    time.sleep(0.1)
+            channel.sendall(b'out:' + command)
+            channel.send_exit_status(0)
+            channel.close()
+
+        threading.Thread(target=reply, daemon=True).start()
+        return True
+
+
+class StandInSSHServer:
+    """
+    A paramiko SSH server on 127.0.0.1 that counts handshakes.
+    """
+
+    host_key = None
+
+    def __init__(self):
+        if StandInSSHServer.host_key is None:
+            StandInSSHServer.host_key = paramiko.RSAKey.generate(1024)
+        self.transports = []
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    @property
+    def handshakes(self):
+        return len(self.transports)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(self.host_key)
+            transport.start_server(server=StandInServer())
+            self.transports.append(transport)
+
+    def drop_connections(self):
+        for transport in self.transports:
+            transport.close()
+
+    def stop(self):
+        self.listener.close()
+        self.drop_connections()
+
+
+class SSHConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StandInSSHServer()
+        self.addCleanup(self.server.stop)
+
+    def make_pool(self, **kwargs):
+        pool = SSHConnectionPool(connect_timeout=5, **kwargs)
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def device(self, username='netops'):
+        return Device(ip_address='127.0.0.1', ssh_port=self.server.port, ssh_username=username, ssh_password='secret')
+
+    def run_command(self, client, command):
+        _, stdout, _ = client.exec_command(command, timeout=5)
+        return stdout.read().decode()
+
+    def test_reuses_transport(self):
+        pool = self.make_pool()
+        device = self.device()
+        for _ in range(3):
+            with pool.session(device) as client:
+                self.assertEqual(self.run_command(client, 'show version'), 'out:show version')
+
+        self.assertEqual(self.server.handshakes, 1)
+        self.assertEqual(pool.stats['created'], 1)
+        self.assertEqual(pool.stats['reused'], 2)
+
+    def test_waits_for_a_free_session(self):
+        pool = self.make_pool(max_sessions_per_host=1, wait_timeout=5)
+        device = self.device()
+        client = pool.acquire(device)
+        threading.Timer(0.2, pool.release, args=(device, client)).start()
+
+        started = time.monotonic()
+        with pool.session(device) as second:
+            waited = time.monotonic() - started
+            self.assertIs(second, client)
+        self.assertGreaterEqual(waited, 0.15)
+        self.assertEqual(self.server.handshakes, 1)
+
+    def test_times_out_when_host_is_saturated(self):
+        pool = self.make_pool(max_sessions_per_host=1, wait_timeout=0.2)
+        device = self.device()
+        client = pool.acquire(device)
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(device)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        # Other hosts are not held up by a saturated one.
+        with pool.session(self.device('backup')):
+            pass
+        pool.release(device, client)
+
+    def test_expires_idle_connections(self):
+        pool = self.make_pool(idle_timeout=0.1)
+        device = self.device()
+        with pool.session(device) as first:
+            pass
+        time.sleep(0.2)
+        with pool.session(device) as second:
+            self.assertIsNot(second, first)
+
+        self.assertEqual(pool.stats['evicted'], 1)
+        self.assertEqual(self.server.handshakes, 2)
+        self.assertIsNone(first.get_transport())
+
+    def test_evicts_least_recently_used(self):
+        pool = self.make_pool(max_idle=1)
+        older, newer = self.device('older'), self.device('newer')
+        with pool.session(older) as older_client:
+            pass
+        with pool.session(newer) as newer_client:
+            pass
+
+        self.assertEqual(pool.stats['evicted'], 1)
+        self.assertIsNone(older_client.get_transport())
+        with pool.session(newer) as client:
+            self.assertIs(client, newer_client)
+        with pool.session(older) as client:
+            self.assertIsNot(client, older_client)
+        self.assertEqual(self.server.handshakes, 3)
+
+    def test_replaces_transport_that_fails_health_check(self):
+        pool = self.make_pool()
+        device = self.device()
+        with pool.session(device) as first:
+            pass
+
+        with mock.patch.object(first.get_transport(), 'send_ignore', side_effect=EOFError):
+            with pool.session(device) as second:
+                self.assertEqual(self.run_command(second, 'show clock'), 'out:show clock')
+
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.stats['discarded'], 1)
+        self.assertEqual(self.server.handshakes, 2)
+
+    def test_replaces_transport_dropped_by_device(self):
+        pool = self.make_pool()
+        device = self.device()
+        with pool.session(device) as first:
+            pass
+        self.server.drop_connections()
+        deadline = time.monotonic() + 5
+        while first.get_transport().is_active() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        with pool.session(device) as second:
+            self.assertEqual(self.run_command(second, 'show clock'), 'out:show clock')
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.stats['discarded'], 1)
+
+    def test_deadline_caps_the_wait_for_a_session(self):
+        pool = self.make_pool(max_sessions_per_host=1, wait_timeout=30)
+        device = self.device()
+        client = pool.acquire(device)
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(device, deadline=started + 0.2)
+        self.assertLess(time.monotonic() - started, 1)
+        pool.release(device, client)
+
+    def test_backup_deadline_covers_trickling_output(self):
+        pool = self.make_pool()
+        device = self.device()
+        device.vendor = 'cisco'
+        with mock.patch('devices.utils.get_ssh_pool', return_value=pool):
+            # The output never stalls for the stall timeout, but takes
+            # three seconds in all.
+            success, output, duration, timed_out = _fetch(device, 0.5)
+
+        self.assertFalse(success)
+        self.assertTrue(timed_out)
+        self.assertTrue(output.startswith('Timed out after 0.5s'))
+        self.assertLess(duration, 1.5)
+        self.assertEqual(pool.stats['discarded'], 1)
@@ -3,7 +3,22 @@ from . import views
 
 urlpatterns = [
     path('', views.DeviceListCreateView.as_view(), name='device-list-create'),
+    path('export/', views.DeviceExportView.as_view(), name='device-export'),
+    path('import/', views.device_import, name='device-import'),
+    path('ip-lookup/', views.DeviceIPLookupView.as_view(), name='device-ip-lookup'),
     path('<int:pk>/', views.DeviceDetailView.as_view(), name='device-detail'),
     path('<int:device_id>/commands/', views.DeviceCommandListCreateView.as_view(), name='device-commands'),
+    path('<int:device_id>/configurations/', views.DeviceConfigurationListView.as_view(), name='device-configurations'),
+    path('<int:device_id>/configurations/diff/', views.device_configuration_diff, name='device-configuration-diff'),
+    path('commands/export/', views.DeviceCommandExportView.as_view(), name='device-command-export'),
+    path('commands/<int:pk>/', views.DeviceCommandDetailView.as_view(), name='device-command-detail'),
+    path('backups/', views.BackupRunListCreateView.as_view(), name='backup-runs'),
+    path('backups/<int:pk>/', views.BackupRunDetailView.as_view(), name='backup-run-detail'),
+    path('backups/<int:pk>/resume/', views.resume_backup_run, name='backup-run-resume'),
+    path('<int:device_id>/health/', views.device_health, name='device-health'),
+    path('health/', views.fleet_health, name='fleet-health'),
+    path('events/', views.device_events, name='device-events'),
     path('statistics/', views.device_statistics, name='device-statistics'),
+    path('statistics/cache/', views.device_statistics_cache, name='device-statistics-cache'),
+    path('execute-bulk-command/', views.execute_bulk_command, name='device-bulk-command'),
 ]
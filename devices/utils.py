@@ -1,19 +1,19 @@
 import socket
-import subprocess
-import paramiko
+import time
 from django.utils import timezone
+from .config_store import save_backup
+from .icmp import ping_many
 from .models import Device, DeviceCommand
+from .poller import run_sweep
+from .ssh_pool import get_ssh_pool
 
-def ping_device(ip_address):
+def ping_device(ip_address, timeout=5):
     """
     Ping a device to check if it's reachable.
     """
     try:
-        # For Unix/Linux/MacOS
-        result = subprocess.run(['ping', '-c', '1', ip_address], 
-                              capture_output=True, text=True, timeout=5)
-        return result.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return ping_many([ip_address], timeout=timeout).get(str(ip_address)) is not None
+    except ValueError:
         return False
 
 def check_port_open(ip_address, port, timeout=5):
@@ -29,27 +29,44 @@ def check_port_open(ip_address, port, timeout=5):
     except:
         return False
 
-def execute_ssh_command(device, command):
+def _read_before(channel, deadline, stderr=False):
+    """
+    Read a channel's stdout (or stderr) to EOF, raising ``TimeoutError``
+    at ``deadline``.
+    """
+    recv = channel.recv_stderr if stderr else channel.recv
+    chunks = []
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('Command output did not finish in time')
+        channel.settimeout(remaining)
+        data = recv(32768)
+        if not data:
+            return b''.join(chunks)
+        chunks.append(data)
+
+def execute_ssh_command(device, command, timeout=None, deadline=None):
     """
     Execute a command on a device via SSH.
+
+    The connection comes from the shared SSH pool, so repeated commands to
+    the same device reuse an already authenticated transport. ``timeout``
+    bounds how long the command's output may stall, in seconds.
+    ``deadline``, a ``time.monotonic()`` value, bounds the whole call:
+    the wait for a pooled session, the connect, and reading the output.
     """
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        ssh.connect(
-            hostname=device.ip_address,
-            port=device.ssh_port,
-            username=device.ssh_username,
-            password=device.ssh_password,
-            timeout=10
-        )
-        
-        stdin, stdout, stderr = ssh.exec_command(command)
-        output = stdout.read().decode('utf-8')
-        error = stderr.read().decode('utf-8')
-        
-        ssh.close()
+        with get_ssh_pool().session(device, deadline) as ssh:
+            stdin, stdout, stderr = ssh.exec_command(command, timeout=timeout)
+            if deadline is None:
+                output = stdout.read()
+                error = stderr.read()
+            else:
+                output = _read_before(stdout.channel, deadline)
+                error = _read_before(stdout.channel, deadline, stderr=True)
+        output = output.decode('utf-8')
+        error = error.decode('utf-8')
         
         if error:
             return False, error
@@ -59,42 +76,45 @@ def execute_ssh_command(device, command):
     except Exception as e:
         return False, str(e)
 
-def update_device_status():
+def update_device_status(concurrency=None, timeout=None):
     """
     Update the status of all devices based on connectivity.
+
+    Devices are probed concurrently by the asyncio poller; see
+    ``devices.poller.run_sweep`` for the returned report.
     """
-    devices = Device.objects.all()
-    
-    for device in devices:
-        if ping_device(device.ip_address):
-            if check_port_open(device.ip_address, device.ssh_port):
-                device.status = 'online'
-            else:
-                device.status = 'offline'
-        else:
-            device.status = 'offline'
-        
-        device.last_seen = timezone.now()
-        device.save()
+    return run_sweep(concurrency=concurrency, timeout=timeout)
+
+# Command that prints the running configuration, per lower-cased vendor
+BACKUP_COMMANDS = {
+    'cisco': 'show running-config',
+    'juniper': 'show configuration',
+    'hp': 'show running-config',
+}
+
+def get_backup_command(device):
+    return BACKUP_COMMANDS.get(device.vendor.lower(), 'show running-config')
+
+def fetch_device_config(device, timeout=None, deadline=None):
+    """
+    Fetch the running configuration of a device.
 
-def backup_device_config(device):
+    Returns ``(success, output)`` like ``execute_ssh_command``, so callers
+    can report why a backup failed.
+    """
+    return execute_ssh_command(device, get_backup_command(device), timeout=timeout, deadline=deadline)
+
+def backup_device_config(device, user=None):
     """
     Backup current configuration of a device.
+
+    The config is recorded with ``save_backup``, so an unchanged config is
+    stored as a pointer to the blob it already has.
     """
-    # This would depend on the device type and vendor
-    # Example for Cisco devices
-    commands = {
-        'cisco': 'show running-config',
-        'juniper': 'show configuration',
-        'hp': 'show running-config',
-    }
-    
-    vendor_lower = device.vendor.lower()
-    command = commands.get(vendor_lower, 'show running-config')
-    
-    success, output = execute_ssh_command(device, command)
+    success, output = fetch_device_config(device)
     
     if success:
+        save_backup(device, output, user=user)
         return output
     else:
         return None
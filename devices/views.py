@@ -1,74 +1,433 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
-from django.utils import timezone
+import hashlib
+import json
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Device, DeviceCommand
-from .serializers import DeviceSerializer, DeviceCommandSerializer
+from django.utils.cache import parse_etags
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .backups import create_backup_run, run_backup_job
+from .bulk import run_bulk_command
+from .config_diff import cached_diff
+from .config_store import hash_config
+from .events import EventStream, get_stream_slots
+from .exports import (
+    COMMAND_EXPORT_COLUMNS, DEVICE_EXPORT_COLUMNS, CSVRenderer, NDJSONRenderer, export_response,
+)
+from .filters import DeviceFilter, parse_network
+from .health import RESOLUTION_NAMES, query_health
+from .imports import CSVParser, NDJSONParser, import_devices, parse_objects
+from .ip_index import get_ip_index, parse_address
+from .jobs import enqueue_command, get_job_backend
+from .models import BackupRun, Device, DeviceCommand, DeviceConfiguration
+from .permissions import CommandPermission, DevicePermission
+from .serializers import (
+    DeviceSerializer, DeviceCommandSerializer, DeviceConfigurationSerializer, BulkCommandSerializer,
+    BackupRunSerializer, DeviceSelectionSerializer,
+)
+from .stats import get_device_statistics, get_statistics_cache_counters
 
-class DeviceListCreateView(generics.ListCreateAPIView):
-    queryset = Device.objects.all()
+class ConditionalGetMixin:
+    """
+    Strong ETags for GET, answering a matching ``If-None-Match`` with 304.
+
+    ``get_etag_state`` returns a cheap fingerprint of what the response
+    would contain (or None to skip). The 304 is returned before the
+    queryset is evaluated or anything is serialized.
+    """
+
+    def get_etag_state(self):
+        raise NotImplementedError
+
+    def get_etag(self):
+        state = self.get_etag_state()
+        if state is None:
+            return None
+        fingerprint = f'{self.request.get_full_path()}|{state}'
+        return '"%s"' % hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+    def conditional(self, request, respond, *args, **kwargs):
+        etag = self.get_etag()
+        if etag is not None:
+            client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+            if '*' in client_etags or etag in client_etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+        response = respond(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            # Cacheable per user, but always revalidated.
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, super().retrieve, *args, **kwargs)
+
+class DeviceListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
+    queryset = DeviceSerializer.setup_eager_loading(Device.objects.all())
     serializer_class = DeviceSerializer
     permission_classes = [permissions.IsAuthenticated]
-    search_fields = ['name', 'ip_address', 'location', 'vendor', 'model']
+    # ``search`` is handled by DeviceFilter, so SearchFilter stays idle here.
+    filterset_class = DeviceFilter
     ordering_fields = ['name', 'created_at', 'last_seen']
 
-class DeviceDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def get_etag_state(self):
+        # Edits bump updated_at, sweeps bump last_seen (and leave
+        # updated_at alone), deletions lower the count: one aggregate
+        # over the filtered queryset sees all three.
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            count=Count('id'), updated=Max('updated_at'), seen=Max('last_seen'),
+        )
+        return f"{state['count']}|{state['updated']}|{state['seen']}"
+
+class DeviceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Device.objects.select_related('created_by')
+    serializer_class = DeviceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_etag_state(self):
+        state = Device.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', 'last_seen').first()
+        return None if state is None else f'{state[0]}|{state[1]}'
+
+class DeviceExportView(generics.GenericAPIView):
+    """
+    Stream the whole (filtered) inventory as NDJSON or CSV (``?format=csv``).
+    """
     queryset = Device.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    filterset_class = DeviceFilter
+    ordering_fields = DeviceListCreateView.ordering_fields
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, DEVICE_EXPORT_COLUMNS, request.accepted_renderer.format, 'devices')
+
+class DeviceIPLookupView(generics.GenericAPIView):
+    """
+    Devices by address, answered from the in-process prefix trie.
+
+    ``?address=`` finds who owns an IP (longest-prefix match, with the
+    matched prefix in ``prefix``). ``?network=`` lists devices inside it
+    (``match=contained``, the default), the entries that contain it
+    (``containing``) or both (``overlapping``).
+    """
     serializer_class = DeviceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request, *args, **kwargs):
+        index = get_ip_index()
+        prefix = None
+        if 'address' in request.query_params:
+            address = parse_address(request.query_params['address'])
+            if address is None:
+                return Response({'error': 'address must be an IPv4 or IPv6 address'}, status=status.HTTP_400_BAD_REQUEST)
+            match = index.lookup(address)
+            device_ids = []
+            if match is not None:
+                prefix, device_ids = str(match[0]), match[1]
+        elif 'network' in request.query_params:
+            network = parse_network(request.query_params['network'])
+            if network is None:
+                return Response({'error': 'network must be a CIDR network'}, status=status.HTTP_400_BAD_REQUEST)
+            match = request.query_params.get('match', 'contained')
+            if match not in ('contained', 'containing', 'overlapping'):
+                return Response({'error': 'match must be contained, containing or overlapping'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            device_ids = [device_id for _, ids in getattr(index, match)(network) for device_id in ids]
+        else:
+            return Response({'error': 'Give an address or a network'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only the requested page of devices is loaded, in trie order.
+        page = self.paginate_queryset(device_ids)
+        devices = DeviceSerializer.setup_eager_loading(Device.objects.all()).in_bulk(page)
+        serializer = self.get_serializer([devices[pk] for pk in page if pk in devices], many=True)
+        response = self.get_paginated_response(serializer.data)
+        if prefix is not None:
+            response.data['prefix'] = prefix
+        return response
+
+@api_view(['POST'])
+@parser_classes([NDJSONParser, CSVParser, JSONParser])
+@permission_classes([permissions.IsAuthenticated, DevicePermission])
+def device_import(request):
+    """
+    Upsert devices by name from an NDJSON, CSV or JSON-array body.
+
+    ``?dry_run=true`` validates and reports without writing anything.
+    """
+    rows = request.data
+    if isinstance(rows, list):
+        rows = parse_objects(rows)
+    elif isinstance(rows, dict):
+        return Response({'error': 'Expected NDJSON, CSV or a JSON array of devices'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true')
+    report = import_devices(rows, request.user, dry_run=dry_run)
+    return Response({**report, 'dry_run': dry_run})
+
 class DeviceCommandListCreateView(generics.ListCreateAPIView):
     serializer_class = DeviceCommandSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_permissions(self):
+        # Listing is open to every user; running a command is not.
+        if self.request.method == 'POST':
+            return [permissions.IsAuthenticated(), CommandPermission()]
+        return super().get_permissions()
+
     def get_queryset(self):
         device_id = self.kwargs.get('device_id')
-        return DeviceCommand.objects.filter(device_id=device_id)
+        return DeviceCommandSerializer.setup_eager_loading(DeviceCommand.objects.filter(device_id=device_id))
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
 
     def perform_create(self, serializer):
         device_id = self.kwargs.get('device_id')
         device = get_object_or_404(Device, id=device_id)
         
-        command_obj = serializer.save(device=device, status='completed')
-        
-        # شبیه‌سازی اجرای دستور (برای demo)
-        command_obj.output = f"Mock output for command: {command_obj.command}\nDevice: {device.name}\nIP: {device.ip_address}\nVendor: {device.vendor}\nModel: {device.model}\nStatus: Command executed successfully\nTimestamp: {timezone.now()}"
-        command_obj.completed_at = timezone.now()
-        command_obj.save()
+        # The command runs on the job queue; the client polls its status.
+        command_obj = serializer.save(device=device, executed_by=self.request.user, status='pending')
+        enqueue_command(command_obj)
+
+class DeviceCommandDetailView(generics.RetrieveAPIView):
+    queryset = DeviceCommandSerializer.setup_eager_loading(DeviceCommand.objects.all())
+    serializer_class = DeviceCommandSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+class DeviceCommandExportView(generics.GenericAPIView):
+    """
+    Stream command history as NDJSON or CSV, optionally filtered by device or status.
+    """
+    queryset = DeviceCommand.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    filterset_fields = ['device', 'status']
+    ordering_fields = ['executed_at', 'completed_at']
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, COMMAND_EXPORT_COLUMNS, request.accepted_renderer.format, 'commands')
+
+class DeviceConfigurationListView(generics.ListAPIView):
+    serializer_class = DeviceConfigurationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        device_id = self.kwargs.get('device_id')
+        return DeviceConfigurationSerializer.setup_eager_loading(
+            DeviceConfiguration.objects.filter(device_id=device_id)
+        )
+
+def _configuration_hash(configuration):
+    if configuration.content_blob_id:
+        return configuration.content_blob.sha256
+    return hash_config(configuration.config_content)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def device_configuration_diff(request, device_id):
+    """
+    Diff two configurations of a device.
+
+    ``to`` defaults to the latest configuration and ``from`` to the one
+    applied before ``to``. ``mode`` is ``unified`` (default) or
+    ``structured``; ``context`` sets unified diff context lines. (DRF
+    reserves ``format`` for content negotiation.)
+    """
+    diff_format = request.query_params.get('mode', 'unified')
+    if diff_format not in ('unified', 'structured'):
+        return Response({'error': 'mode must be unified or structured'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        context = min(max(int(request.query_params.get('context', 3)), 0), 50)
+        to_id = request.query_params.get('to')
+        from_id = request.query_params.get('from')
+        to_id = int(to_id) if to_id else None
+        from_id = int(from_id) if from_id else None
+    except ValueError:
+        return Response({'error': 'from, to and context must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Bodies are deferred: a cached diff is answered from the hashes alone.
+    history = (
+        DeviceConfiguration.objects.filter(device_id=device_id)
+        .select_related('content_blob')
+        .defer('content_blob__data', 'backup_config')
+    )
+    new = get_object_or_404(history, id=to_id) if to_id else history.first()
+    if new is None:
+        return Response({'error': 'Device has no configurations'}, status=status.HTTP_404_NOT_FOUND)
+    if from_id:
+        old = get_object_or_404(history, id=from_id)
+    else:
+        old = history.filter(applied_at__lt=new.applied_at).first()
+        if old is None:
+            return Response({'error': 'No earlier configuration to diff against'}, status=status.HTTP_404_NOT_FOUND)
+
+    def load_texts():
+        return old.get_content(), new.get_content()
+
+    result = cached_diff(_configuration_hash(old), _configuration_hash(new), load_texts, diff_format, context)
+    return Response({'from': old.id, 'to': new.id, 'mode': diff_format, **result})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, CommandPermission])
+def execute_bulk_command(request):
+    """
+    Run one command on many devices and stream per-device results as NDJSON.
+    """
+    serializer = BulkCommandSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    devices = list(serializer.get_device_queryset())
+    if not devices:
+        return Response({'error': 'No devices matched'}, status=status.HTTP_404_NOT_FOUND)
+
+    results = run_bulk_command(devices, serializer.validated_data['command'], request.user)
+    response = StreamingHttpResponse(
+        (json.dumps(result) + '\n' for result in results),
+        content_type='application/x-ndjson',
+    )
+    response['X-Device-Count'] = str(len(devices))
+    return response
+
+def _enqueue_backup_run(run):
+    transaction.on_commit(lambda: get_job_backend().submit(run_backup_job, run.id))
+
+class BackupRunListCreateView(generics.ListAPIView):
+    queryset = BackupRunSerializer.setup_eager_loading(BackupRun.objects.all())
+    serializer_class = BackupRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [permissions.IsAuthenticated(), CommandPermission()]
+        return super().get_permissions()
+
+    def post(self, request, *args, **kwargs):
+        """
+        Start a backup of the selected devices, or of the whole fleet.
+        """
+        selection = DeviceSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        run = create_backup_run(selection.get_device_queryset(), user=request.user)
+        _enqueue_backup_run(run)
+        return Response(BackupRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+class BackupRunDetailView(generics.RetrieveAPIView):
+    queryset = BackupRunSerializer.setup_eager_loading(BackupRun.objects.all())
+    serializer_class = BackupRunSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, CommandPermission])
+def resume_backup_run(request, pk):
+    run = get_object_or_404(BackupRun, pk=pk)
+    if not BackupRun.objects.filter(pk=pk, status='failed').update(status='pending'):
+        return Response({'error': f'Only failed backup runs can be resumed; this one is {run.status}'},
+                        status=status.HTTP_409_CONFLICT)
+    _enqueue_backup_run(run)
+    run.status = 'pending'
+    return Response(BackupRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+def _health_response(request, device_id=None):
+    """
+    Answer a health history query for ``since``/``until`` (ISO 8601, last
+    24 hours by default) at ``resolution`` ``1m``, ``1h``, ``1d`` or auto.
+    """
+    invalid = Response({'error': 'since and until must be ISO 8601 datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        until = parse_datetime(request.query_params['until']) if 'until' in request.query_params else timezone.now()
+        if until is None:
+            return invalid
+        since = parse_datetime(request.query_params['since']) if 'since' in request.query_params else until - timedelta(days=1)
+    except ValueError:
+        # Well formed but out of range, e.g. month 13.
+        return invalid
+    if since is None:
+        return invalid
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    if timezone.is_naive(until):
+        until = timezone.make_aware(until)
+    if since >= until:
+        return Response({'error': 'since must be before until'}, status=status.HTTP_400_BAD_REQUEST)
+
+    resolution = request.query_params.get('resolution')
+    if resolution and resolution not in RESOLUTION_NAMES:
+        return Response({'error': 'resolution must be 1m, 1h or 1d'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(query_health(since, until, RESOLUTION_NAMES.get(resolution), device_id=device_id))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def device_health(request, device_id):
+    get_object_or_404(Device.objects.only('id'), id=device_id)
+    return _health_response(request, device_id)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def fleet_health(request):
+    return _health_response(request)
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets ``Accept: text/event-stream`` through content negotiation; the
+    stream itself bypasses rendering, so this only renders errors.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data)
+
+@api_view(['GET'])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+@permission_classes([permissions.IsAuthenticated])
+def device_events(request):
+    """
+    Stream device status changes and command completions as Server-Sent Events.
+
+    Resumes after the ``Last-Event-ID`` header, or ``last_event_id`` for
+    clients that cannot set headers on the first request.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return Response({'error': 'Last-Event-ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    slots = get_stream_slots()
+    if not slots.acquire():
+        # Each open stream holds a worker thread; past the cap, keep the rest for the API.
+        response = Response(
+            {'error': 'Too many open event streams, retry later'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response['Retry-After'] = '30'
+        return response
+
+    response = StreamingHttpResponse(EventStream(slots, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def device_statistics(request):
-    total_devices = Device.objects.count()
-    online_devices = Device.objects.filter(status='online').count()
-    offline_devices = Device.objects.filter(status='offline').count()
-    maintenance_devices = Device.objects.filter(status='maintenance').count()
-    error_devices = Device.objects.filter(status='error').count()
-    
-    device_types = {}
-    for device in Device.objects.all():
-        device_type = device.device_type
-        if device_type in device_types:
-            device_types[device_type] += 1
-        else:
-            device_types[device_type] = 1
-    
-    vendors = {}
-    for device in Device.objects.all():
-        vendor = device.vendor
-        if vendor in vendors:
-            vendors[vendor] += 1
-        else:
-            vendors[vendor] = 1
-    
-    return Response({
-        'total_devices': total_devices,
-        'online_devices': online_devices,
-        'offline_devices': offline_devices,
-        'maintenance_devices': maintenance_devices,
-        'error_devices': error_devices,
-        'device_types': device_types,
-        'vendors': vendors,
-        'uptime_percentage': round((online_devices / total_devices * 100), 2) if total_devices > 0 else 0
-    })
+    return Response(get_device_statistics())
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def device_statistics_cache(request):
+    return Response(get_statistics_cache_counters())
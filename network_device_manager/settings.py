@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
     'drf_yasg',
@@ -33,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'audit.middleware.AuditMiddleware',
 ]
 
 ROOT_URLCONF = 'network_device_manager.urls'
@@ -67,13 +69,40 @@ DATABASES = {
     }
 }
 
+# Cache: local memory by default, Redis when REDIS_URL is set
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledHashingBackend']
+
+# The first hasher hashes new and upgraded passwords; the rest still verify
+PASSWORD_HASHERS = list(dict.fromkeys([
+    os.environ.get('PASSWORD_HASHER', 'accounts.hashers.TunedPBKDF2PasswordHasher'),
+    'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '600000'))
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -85,6 +114,13 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.environ.get('LOGIN_RATE_LIMIT', '30/min'),
+    },
+    # Proxies in front of the app that append to X-Forwarded-For: the
+    # shipped nginx. Throttles key on the address the last one saw, not on
+    # whatever the client put in the header. Set to 0 when serving directly.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '1')),
 }
 
 from datetime import timedelta
@@ -94,6 +130,8 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.tokens.UserClaimsTokenRefreshSerializer',
 }
 
 # CORS
@@ -115,3 +153,73 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Device health polling
+DEVICE_POLL_CONCURRENCY = int(os.environ.get('DEVICE_POLL_CONCURRENCY', '200'))
+DEVICE_POLL_TIMEOUT = float(os.environ.get('DEVICE_POLL_TIMEOUT', '5'))
+DEVICE_POLL_WRITE_BATCH_SIZE = int(os.environ.get('DEVICE_POLL_WRITE_BATCH_SIZE', '500'))
+DEVICE_POLL_ICMP = os.environ.get('DEVICE_POLL_ICMP', 'True') == 'True'
+DEVICE_POLL_ICMP_MODE = os.environ.get('DEVICE_POLL_ICMP_MODE') or None  # raw, dgram or tcp; auto when unset
+DEVICE_STATISTICS_CACHE_TTL = int(os.environ.get('DEVICE_STATISTICS_CACHE_TTL', '30'))
+
+# Adaptive probe scheduling (seconds); per-type base intervals live in devices.scheduler
+PROBE_MIN_INTERVAL = float(os.environ.get('PROBE_MIN_INTERVAL', '10'))
+PROBE_MAX_INTERVAL = float(os.environ.get('PROBE_MAX_INTERVAL', '3600'))
+PROBE_JITTER = float(os.environ.get('PROBE_JITTER', '0.1'))
+
+# Device health history retention
+HEALTH_SAMPLE_RETENTION_DAYS = int(os.environ.get('HEALTH_SAMPLE_RETENTION_DAYS', '2'))
+HEALTH_MINUTE_RETENTION_DAYS = int(os.environ.get('HEALTH_MINUTE_RETENTION_DAYS', '14'))
+HEALTH_HOUR_RETENTION_DAYS = int(os.environ.get('HEALTH_HOUR_RETENTION_DAYS', '180'))
+HEALTH_DAY_RETENTION_DAYS = int(os.environ.get('HEALTH_DAY_RETENTION_DAYS', '1825'))
+
+# Live status event stream (Server-Sent Events)
+STATUS_STREAM_POLL_INTERVAL = float(os.environ.get('STATUS_STREAM_POLL_INTERVAL', '1'))
+STATUS_STREAM_HEARTBEAT = int(os.environ.get('STATUS_STREAM_HEARTBEAT', '15'))
+STATUS_STREAM_MAX_DURATION = int(os.environ.get('STATUS_STREAM_MAX_DURATION', '3600'))
+# Open streams per web worker process; each holds a worker thread (503 beyond)
+STATUS_STREAM_MAX_CLIENTS = int(os.environ.get('STATUS_STREAM_MAX_CLIENTS', '4'))
+# Seconds an event id may stay uncommitted behind newer ones and still be delivered
+STATUS_STREAM_SETTLE_WINDOW = int(os.environ.get('STATUS_STREAM_SETTLE_WINDOW', '60'))
+STATUS_EVENT_RETENTION_HOURS = int(os.environ.get('STATUS_EVENT_RETENTION_HOURS', '24'))
+
+# SSH connection pool
+SSH_POOL_MAX_SESSIONS_PER_HOST = int(os.environ.get('SSH_POOL_MAX_SESSIONS_PER_HOST', '4'))
+SSH_POOL_IDLE_TIMEOUT = int(os.environ.get('SSH_POOL_IDLE_TIMEOUT', '300'))
+SSH_POOL_MAX_IDLE = int(os.environ.get('SSH_POOL_MAX_IDLE', '256'))
+
+# Bulk command execution
+BULK_COMMAND_MAX_WORKERS = int(os.environ.get('BULK_COMMAND_MAX_WORKERS', '50'))
+
+# Background command queue
+COMMAND_QUEUE_BACKEND = os.environ.get('COMMAND_QUEUE_BACKEND', 'devices.jobs.ThreadPoolBackend')
+COMMAND_QUEUE_WORKERS = int(os.environ.get('COMMAND_QUEUE_WORKERS', '16'))
+
+# Audit log writer
+AUDIT_QUEUE_MAXSIZE = int(os.environ.get('AUDIT_QUEUE_MAXSIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', '1'))
+AUDIT_QUEUE_PUT_TIMEOUT = float(os.environ.get('AUDIT_QUEUE_PUT_TIMEOUT', '0'))
+AUDIT_RETENTION_DAYS = int(os.environ.get('AUDIT_RETENTION_DAYS', '90'))
+AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archives', 'audit'))
+
+# Configuration backups
+CONFIG_BACKUP_WORKERS = int(os.environ.get('CONFIG_BACKUP_WORKERS', '50'))
+# Wall-clock seconds per device: pool wait, connect and the whole transfer
+CONFIG_BACKUP_TIMEOUT = int(os.environ.get('CONFIG_BACKUP_TIMEOUT', '60'))
+
+# Configuration diffs
+CONFIG_DIFF_CACHE_TTL = int(os.environ.get('CONFIG_DIFF_CACHE_TTL', '3600'))
+
+# Users resolved from token claims; cached rows for the paths that need them
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', '60'))
+
+# Login: password hashing pool (0 hashes inline) and verified-password cache
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', '2'))
+LOGIN_VERIFY_CACHE_TTL = int(os.environ.get('LOGIN_VERIFY_CACHE_TTL', '300'))
+LOGIN_VERIFY_CACHE_SIZE = int(os.environ.get('LOGIN_VERIFY_CACHE_SIZE', '10000'))
+
+# Refresh token blacklist: per-process Bloom filter synced from the database
+TOKEN_BLACKLIST_SYNC_INTERVAL = float(os.environ.get('TOKEN_BLACKLIST_SYNC_INTERVAL', '5'))
+TOKEN_BLACKLIST_FILTER_CAPACITY = int(os.environ.get('TOKEN_BLACKLIST_FILTER_CAPACITY', '100000'))
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = float(os.environ.get('TOKEN_BLACKLIST_FILTER_ERROR_RATE', '0.001'))